@@ -1,353 +1,509 @@
-import streamlit as st
-import pandas as pd
-import hashlib
-from datetime import datetime, date
-import json
-import os
-from sqlalchemy import create_engine, text
-
-# --- Importa as páginas ---
-from page.home import show_home_page
-from page.consulta_estoq_cd import show_consulta_page
-from page.pedidos import show_pedidos_page
-from page.aprovacao_pedidos import show_aprovacao_page
-from page.status_usuarios import show_status_page
-from page.admin_maint import show_admin_page
-from page.admin_tools import show_admin_tools
-from page.mudar_senha import show_mudar_senha_page
-from page.contato import show_contato_page
-from page.upload_ofertas import show_upload_ofertas_page
-from page.ver_ofertas import show_ver_ofertas_page
-
-# =========================================================
-# CONFIGURAÇÕES INICIAIS
-# =========================================================
-st.set_page_config(page_title="Gestão de Produtos", layout="wide")
-
-BASE_DATA_PATH = os.environ.get("RENDER_DISK_PATH", "data")
-os.makedirs(BASE_DATA_PATH, exist_ok=True) 
-
-LISTA_LOJAS = ["001", "002", "003", "004", "005", "006",
-               "007", "008", "011", "012", "013", "014", "017", "018"]
-COLUNAS_LOJAS_PEDIDO = [f"loja_{loja}" for loja in LISTA_LOJAS]
-
-
-# =========================================================
-# FUNÇÕES DE SEGURANÇA
-# =========================================================
-def make_hashes(password):
-    return hashlib.sha256(password.encode()).hexdigest()
-
-def check_hashes(password, hashed_text):
-    return make_hashes(password) == hashed_text
-
-
-# =========================================================
-# CONEXÃO DE BANCO (APENAS POSTGRES)
-# =========================================================
-@st.cache_resource
-def get_engine():
-    db_url = os.getenv("DATABASE_URL")
-    
-    if not db_url:
-        st.error("Erro fatal: A variável de ambiente DATABASE_URL não foi encontrada.")
-        st.stop()
-        
-    if db_url.startswith("postgres://"):
-        db_url = db_url.replace("postgres://", "postgresql://", 1)
-        
-    return create_engine(db_url, connect_args={"sslmode": "require"}, pool_size=10, max_overflow=5)
-
-engine = get_engine()
-
-
-# =========================================================
-# CRIAÇÃO / MIGRAÇÃO DE TABELAS
-# =========================================================
-def create_db_tables():
-    """
-    Cria todas as tabelas necessárias e executa a limpeza de dados antigos.
-    """
-    try:
-        with engine.begin() as conn: 
-            # --- tabela de usuários ---
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS users (
-                    username TEXT PRIMARY KEY,
-                    password TEXT NOT NULL,
-                    ultimo_acesso TIMESTAMP,
-                    status_logado TEXT,
-                    role TEXT DEFAULT 'user',
-                    lojas_acesso TEXT
-                )
-            """))
-
-            # --- tabela de pedidos ---
-            lojas_sql_cols = ", ".join([f"loja_{loja} INTEGER DEFAULT 0" for loja in LISTA_LOJAS])
-            conn.execute(text(f"""
-                CREATE TABLE IF NOT EXISTS pedidos_consolidados (
-                    id SERIAL PRIMARY KEY, 
-                    codigo TEXT NOT NULL,
-                    produto TEXT,
-                    ean TEXT,
-                    embseparacao INTEGER,
-                    data_pedido TIMESTAMP,
-                    data_aprovacao TIMESTAMP,
-                    usuario_pedido TEXT,
-                    status_item TEXT,
-                    status_aprovacao TEXT DEFAULT 'Pendente',
-                    total_cx INTEGER,
-                    {lojas_sql_cols}
-                )
-            """))
-
-            # --- tabelas de "Contato" ---
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS contato_chamados (
-                    id SERIAL PRIMARY KEY,
-                    usuario_username TEXT REFERENCES users(username),
-                    assunto TEXT,
-                    data_criacao TIMESTAMP,
-                    ultimo_update TIMESTAMP,
-                    status TEXT DEFAULT 'Aguardando Retorno' 
-                )
-            """)) 
-            
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS contato_mensagens (
-                    id SERIAL PRIMARY KEY,
-                    chamado_id INTEGER REFERENCES contato_chamados(id) ON DELETE CASCADE,
-                    remetente_username TEXT,
-                    mensagem TEXT,
-                    data_envio TIMESTAMP
-                )
-            """))
-            
-            # --- tabela de OFERTAS ---
-            conn.execute(text("""
-                CREATE TABLE IF NOT EXISTS ofertas (
-                    id SERIAL PRIMARY KEY,
-                    codigo INTEGER NOT NULL,
-                    produto TEXT,
-                    oferta NUMERIC(10, 2),
-                    data_inicio DATE NOT NULL,
-                    data_final DATE NOT NULL,
-                    UNIQUE(codigo, data_inicio, data_final)
-                )
-            """))
-            
-            # --- Lógica de Auto-Deleção (Limpeza de 7 dias Contato) ---
-            seven_days_ago = (datetime.now() - pd.Timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
-            
-            conn.execute(text("""
-                DELETE FROM contato_chamados 
-                WHERE ultimo_update < :seven_days_ago
-            """), {"seven_days_ago": seven_days_ago})
-            
-    except Exception as e:
-        if "foreign key constraint" not in str(e) and "does not exist" not in str(e):
-             st.error(f"Erro ao inicializar o banco de dados: {e}")
-
-# =========================================================
-# LOGIN E PERFIL DE USUÁRIO
-# =========================================================
-def check_login_and_get_roles(username, password):
-    with engine.connect() as conn:
-        query = text("SELECT password, role, lojas_acesso FROM users WHERE username = :username")
-        result = conn.execute(query, {"username": username.lower()})
-        data = result.fetchone()
-
-    if data:
-        hashed_password, role, lojas_acesso_json = data
-        if check_hashes(password, hashed_password):
-            lojas = []
-            if lojas_acesso_json:
-                try:
-                    lojas = json.loads(lojas_acesso_json)
-                except json.JSONDecodeError:
-                    lojas = []
-            return True, (role or "user"), lojas
-    return False, "user", []
-
-
-def update_user_status(username, status):
-    current_time = datetime.now()
-    query = text("""
-        UPDATE users 
-        SET ultimo_acesso = :time, status_logado = :status 
-        WHERE username = :username
-    """)
-    
-    with engine.begin() as conn:
-        conn.execute(query, {
-            "time": current_time, 
-            "status": status, 
-            "username": username.lower()
-        })
-
-# =========================================================
-# TELA DE LOGIN
-# =========================================================
-def login_page():
-    st.title("🔐 Login do Sistema")
-    username = st.text_input("Usuário:").lower()
-    senha = st.text_input("Senha:", type="password")
-
-    if st.button("Entrar", type="primary"):
-        logged_in, role, lojas = check_login_and_get_roles(username, senha)
-        if logged_in:
-            st.session_state["logged_in"] = True
-            st.session_state["username"] = username
-            st.session_state["role"] = role
-            st.session_state["lojas_acesso"] = lojas
-            update_user_status(username, "LOGADO")
-            st.rerun()
-        else:
-            st.error("Usuário ou senha inválidos.")
-    st.stop()
-
-# =========================================================
-# FUNÇÃO DE PRIMEIRO ACESSO (BOOTSTRAP)
-# =========================================================
-def check_if_first_run(engine):
-    """Verifica se existe algum usuário no banco."""
-    try:
-        with engine.connect() as conn:
-            query = text("SELECT COUNT(username) FROM users")
-            result = conn.execute(query)
-            count = result.scalar_one_or_none() or 0
-        return count == 0
-    except Exception as e:
-        if "does not exist" in str(e): # Se a tabela 'users' ainda não foi criada
-            return True
-        st.error(f"Erro ao verificar contagem de usuários: {e}")
-        return False
-
-# =========================================================
-# FUNÇÃO DE CONTAGEM DE MENSAGENS
-# =========================================================
-@st.cache_data(ttl=60) # Cache de 1 minuto
-def get_unread_message_count(_engine, username, role):
-    """Pega a contagem de mensagens não lidas para o usuário/admin."""
-    query_str = ""
-    params = {}
-    
-    if role == "admin":
-        # Admin vê tickets 'Aguardando Retorno'
-        query_str = "SELECT COUNT(id) FROM contato_chamados WHERE status = 'Aguardando Retorno'"
-    else:
-        # Usuário vê tickets 'Respondidos'
-        query_str = "SELECT COUNT(id) FROM contato_chamados WHERE status = 'Respondido' AND usuario_username = :username"
-        params = {"username": username}
-
-    if not query_str:
-        return 0
-
-    try:
-        with _engine.connect() as conn:
-            result = conn.execute(text(query_str), params)
-            count = result.scalar_one_or_none() or 0
-        return count
-    except Exception as e:
-        # Se as tabelas ainda não existem, não falha
-        if "does not exist" not in str(e):
-            print(f"Erro ao buscar contagem de mensagens: {e}") 
-        return 0
-
-# =========================================================
-# MAIN APP
-# =========================================================
-def main():
-    create_db_tables()
-    
-    is_first_run = check_if_first_run(engine)
-
-    if "logged_in" not in st.session_state:
-        st.session_state["logged_in"] = False
-
-    if is_first_run:
-        st.warning("🚀 Bem-vindo! Detectamos que este é o primeiro acesso.")
-        st.info("Por favor, crie o primeiro usuário administrador do sistema.")
-        show_admin_page(engine=engine, base_data_path=BASE_DATA_PATH)
-        st.stop() 
-
-    if not st.session_state["logged_in"]:
-        login_page() 
-
-    # --- O RESTO DA PÁGINA (SÓ RODA SE LOGADO) ---
-    st.sidebar.success(f"Logado como: {st.session_state['username']}")
-
-    if st.sidebar.button("Logout"):
-        update_user_status(st.session_state["username"], "DESLOGADO")
-        st.session_state.clear()
-        st.session_state["logged_in"] = False
-        st.rerun()
-
-    # --- Lógica de Notificação de Contato ---
-    username = st.session_state.get("username", "")
-    role = st.session_state.get("role", "user")
-    
-    unread_count = get_unread_message_count(engine, username, role)
-    
-    contato_menu_label = "Contato"
-    if unread_count > 0:
-        contato_menu_label = f"Contato ({unread_count}) 🔴"
-
-    # --- MENU LATERAL ---
-    paginas_disponiveis_labels = {
-        "Home": show_home_page,
-        "Consulta de Estoque CD": show_consulta_page,
-        # "Histórico de Transferencia CD": show_historico_page, # REMOVIDO
-        "Ofertas Atuais": show_ver_ofertas_page,
-        "Alterar Senha": show_mudar_senha_page,
-        contato_menu_label: show_contato_page, 
-    }
-
-    if st.session_state.get("lojas_acesso"):
-        paginas_disponiveis_labels["Digitar Pedidos"] = show_pedidos_page
-
-    if st.session_state.get("role") == "mkt":
-        paginas_disponiveis_labels["Upload Ofertas"] = show_upload_ofertas_page
-    
-    if st.session_state.get("role") == "admin":
-        paginas_disponiveis_labels["Aprovação de Pedidos"] = show_aprovacao_page
-        paginas_disponiveis_labels["Status do Usuário"] = show_status_page
-        paginas_disponiveis_labels["Administração"] = show_admin_page
-        paginas_disponiveis_labels["Atualização de Dependências"] = show_admin_tools
-        if "Upload Ofertas" not in paginas_disponiveis_labels:
-            paginas_disponiveis_labels["Upload Ofertas"] = show_upload_ofertas_page
-
-    
-    # --- Lógica de Navegação Atualizada ---
-    page_list_labels = list(paginas_disponiveis_labels.keys())
-
-    if "page_key" not in st.session_state:
-        st.session_state.page_key = "Home"
-    
-    if st.session_state.page_key not in page_list_labels:
-        if "Contato" in st.session_state.page_key:
-            st.session_state.page_key = contato_menu_label 
-        else:
-            st.session_state.page_key = "Home" 
-
-    def update_sidebar_selection():
-        st.session_state.page_key = st.session_state["sidebar_radio_key"]
-
-    current_page_index = page_list_labels.index(st.session_state.page_key)
-
-    st.sidebar.radio(
-        "Selecione a Página:", 
-        page_list_labels, 
-        index=current_page_index,
-        on_change=update_sidebar_selection,
-        key="sidebar_radio_key"
-    )
-    
-    selected_page_func = paginas_disponiveis_labels[st.session_state.page_key]
-    selected_page_func(engine=engine, base_data_path=BASE_DATA_PATH)
-
-
-if __name__ == "__main__":
-    main()
-
-
+import streamlit as st
+import hashlib
+from datetime import datetime, timedelta
+import importlib
+import json
+import os
+from sqlalchemy import text
+
+from services.db import (
+    criar_engine, iniciar_contagem_queries, get_contagem_queries, get_tempo_rerun, registrar_queries_pagina
+)
+from services.bootstrap import garantir_schema, is_primeiro_acesso, executar_periodicamente
+from services.warmup import aquecer_na_partida
+from services.heartbeat import iniciar_heartbeat, registrar_atividade, descartar_atividade
+from services.notificacoes import (
+    iniciar_listener, listener_ativo, get_unread_count, notificar_contato, invalidar_contagens,
+    atualizar_contagens_se_expirado,
+)
+
+# --- Registro de páginas (import sob demanda) ---
+# Cada módulo de page/ só é importado na primeira vez em que a página é aberta,
+# então o login renderiza sem carregar pandas/numpy e o código das outras páginas.
+PAGINAS = {
+    "home": ("page.home", "show_home_page"),
+    "consulta": ("page.consulta_estoq_cd", "show_consulta_page"),
+    "pedidos": ("page.pedidos", "show_pedidos_page"),
+    "aprovacao": ("page.aprovacao_pedidos", "show_aprovacao_page"),
+    "consolidado_cd": ("page.consolidado_cd", "show_consolidado_page"),
+    "status": ("page.status_usuarios", "show_status_page"),
+    "admin": ("page.admin_maint", "show_admin_page"),
+    "admin_tools": ("page.admin_tools", "show_admin_tools"),
+    "mudar_senha": ("page.mudar_senha", "show_mudar_senha_page"),
+    "contato": ("page.contato", "show_contato_page"),
+    "upload_ofertas": ("page.upload_ofertas", "show_upload_ofertas_page"),
+    "ver_ofertas": ("page.ver_ofertas", "show_ver_ofertas_page"),
+    "metricas": ("page.metricas", "show_metricas_page"),
+}
+
+
+def carregar_pagina(pagina_id):
+    """Importa (uma vez por processo) e retorna a função da página."""
+    modulo, funcao = PAGINAS[pagina_id]
+    return getattr(importlib.import_module(modulo), funcao)
+
+# =========================================================
+# CONFIGURAÇÕES INICIAIS
+# =========================================================
+st.set_page_config(page_title="Gestão de Produtos", layout="wide")
+
+BASE_DATA_PATH = os.environ.get("RENDER_DISK_PATH", "data")
+os.makedirs(BASE_DATA_PATH, exist_ok=True) 
+
+LISTA_LOJAS = ["001", "002", "003", "004", "005", "006",
+               "007", "008", "011", "012", "013", "014", "017", "018"]
+COLUNAS_LOJAS_PEDIDO = [f"loja_{loja}" for loja in LISTA_LOJAS]
+
+
+# =========================================================
+# FUNÇÕES DE SEGURANÇA
+# =========================================================
+def make_hashes(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def check_hashes(password, hashed_text):
+    return make_hashes(password) == hashed_text
+
+
+# =========================================================
+# CONEXÃO DE BANCO (APENAS POSTGRES)
+# =========================================================
+@st.cache_resource
+def get_engine():
+    db_url = os.getenv("DATABASE_URL")
+    
+    if not db_url:
+        st.error("Erro fatal: A variável de ambiente DATABASE_URL não foi encontrada.")
+        st.stop()
+        
+    # Pool configurável por variáveis de ambiente (ver services/db.py)
+    return criar_engine(db_url)
+
+engine = get_engine()
+
+
+# =========================================================
+# CRIAÇÃO / MIGRAÇÃO DE TABELAS
+# =========================================================
+def criar_indices_vigencia_ofertas(conn):
+    """
+    Índice GiST (codigo, vigencia) e, se OFERTAS_SEM_SOBREPOSICAO=1, a restrição
+    que impede duas ofertas do mesmo código com períodos sobrepostos. Ambos
+    precisam da extensão btree_gist; sem ela (ou sem permissão para criá-la)
+    as consultas usam o índice único (codigo, ...) e o GiST só de vigencia.
+    """
+    try:
+        with conn.begin_nested():
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS btree_gist"))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_ofertas_codigo_vigencia
+                ON ofertas USING gist (codigo, vigencia)
+            """))
+    except Exception as e:
+        print(f"btree_gist indisponível, seguindo sem o índice (codigo, vigencia): {e}")
+        return
+
+    if os.getenv("OFERTAS_SEM_SOBREPOSICAO", "0") != "1":
+        return
+    existe = conn.execute(text(
+        "SELECT 1 FROM pg_constraint WHERE conname = 'ofertas_sem_sobreposicao'")).first()
+    if existe:
+        return
+    try:
+        with conn.begin_nested():
+            conn.execute(text("""
+                ALTER TABLE ofertas ADD CONSTRAINT ofertas_sem_sobreposicao
+                EXCLUDE USING gist (codigo WITH =, vigencia WITH &&)
+            """))
+    except Exception as e:
+        # Normalmente: já existem ofertas sobrepostas no banco
+        print(f"Não foi possível criar a restrição de sobreposição de ofertas: {e}")
+
+# Ofertas antigas podem ter data_final < data_inicio: a vigência delas é o
+# intervalo vazio (daterange falharia) e elas continuam na tabela para um
+# admin corrigir em 'Ofertas Atuais'. Escritas novas passam pelo CHECK.
+VIGENCIA_OFERTAS_SQL = """
+    CASE WHEN data_final >= data_inicio
+         THEN daterange(data_inicio, data_final, '[]')
+         ELSE CAST('empty' AS daterange)
+    END
+"""
+
+def criar_vigencia_ofertas(conn):
+    """
+    Coluna gerada 'vigencia' e restrição CHECK (data_final >= data_inicio).
+    O CHECK é NOT VALID: vale para inserções/atualizações, sem exigir que as
+    linhas antigas já estejam corretas. Uma 'vigencia' criada com a expressão
+    anterior (sem o caso vazio) é recriada; os índices sobre ela vêm depois.
+    """
+    expressao = conn.execute(text("""
+        SELECT generation_expression FROM information_schema.columns
+        WHERE table_name = 'ofertas' AND column_name = 'vigencia'
+    """)).scalar()
+    if expressao is not None and "empty" not in expressao:
+        conn.execute(text("ALTER TABLE ofertas DROP COLUMN vigencia"))
+    conn.execute(text(f"""
+        ALTER TABLE ofertas ADD COLUMN IF NOT EXISTS vigencia daterange
+        GENERATED ALWAYS AS ({VIGENCIA_OFERTAS_SQL}) STORED
+    """))
+
+    existe = conn.execute(text(
+        "SELECT 1 FROM pg_constraint WHERE conname = 'ofertas_periodo_valido'")).first()
+    if not existe:
+        conn.execute(text("""
+            ALTER TABLE ofertas ADD CONSTRAINT ofertas_periodo_valido
+            CHECK (data_final >= data_inicio) NOT VALID
+        """))
+    invertidas = conn.execute(text(
+        "SELECT COUNT(*) FROM ofertas WHERE data_final < data_inicio")).scalar()
+    if invertidas:
+        print(f"{invertidas} oferta(s) com data final anterior à de início: corrija em 'Ofertas Atuais'.")
+
+def create_db_tables():
+    """
+    Cria todas as tabelas necessárias. Retorna True se o schema está pronto.
+    Chamada uma vez por processo (ver services/bootstrap.py).
+    """
+    try:
+        with engine.begin() as conn: 
+            # --- tabela de usuários ---
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS users (
+                    username TEXT PRIMARY KEY,
+                    password TEXT NOT NULL,
+                    ultimo_acesso TIMESTAMP,
+                    status_logado TEXT,
+                    role TEXT DEFAULT 'user',
+                    lojas_acesso TEXT
+                )
+            """))
+
+            # --- tabela de pedidos ---
+            lojas_sql_cols = ", ".join([f"loja_{loja} INTEGER DEFAULT 0" for loja in LISTA_LOJAS])
+            conn.execute(text(f"""
+                CREATE TABLE IF NOT EXISTS pedidos_consolidados (
+                    id SERIAL PRIMARY KEY, 
+                    codigo TEXT NOT NULL,
+                    produto TEXT,
+                    ean TEXT,
+                    embseparacao INTEGER,
+                    data_pedido TIMESTAMP,
+                    data_aprovacao TIMESTAMP,
+                    usuario_pedido TEXT,
+                    status_item TEXT,
+                    status_aprovacao TEXT DEFAULT 'Pendente',
+                    total_cx INTEGER,
+                    {lojas_sql_cols}
+                )
+            """))
+            # Versão da linha: aprovações/rejeições só gravam se a linha não mudou desde que a grade foi carregada
+            conn.execute(text("""
+                ALTER TABLE pedidos_consolidados ADD COLUMN IF NOT EXISTS versao INTEGER NOT NULL DEFAULT 1
+            """))
+            # Consolidado do CD: pedidos aprovados por janela de data de aprovação
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_pedidos_status_aprovacao_data
+                ON pedidos_consolidados (status_aprovacao, data_aprovacao)
+            """))
+
+            # --- tabelas de "Contato" ---
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS contato_chamados (
+                    id SERIAL PRIMARY KEY,
+                    usuario_username TEXT REFERENCES users(username),
+                    assunto TEXT,
+                    data_criacao TIMESTAMP,
+                    ultimo_update TIMESTAMP,
+                    status TEXT DEFAULT 'Aguardando Retorno' 
+                )
+            """)) 
+            
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS contato_mensagens (
+                    id SERIAL PRIMARY KEY,
+                    chamado_id INTEGER REFERENCES contato_chamados(id) ON DELETE CASCADE,
+                    remetente_username TEXT,
+                    mensagem TEXT,
+                    data_envio TIMESTAMP
+                )
+            """))
+            # data_envio vem do banco: o relógio do servidor do app não ordena os envios
+            conn.execute(text("""
+                ALTER TABLE contato_mensagens ALTER COLUMN data_envio SET DEFAULT now()
+            """))
+            # Chat paginado: últimas N mensagens e anteriores por (data_envio, id); novas por id
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_contato_mensagens_chamado_envio
+                ON contato_mensagens (chamado_id, data_envio, id)
+            """))
+            
+            # --- tabela de OFERTAS ---
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS ofertas (
+                    id SERIAL PRIMARY KEY,
+                    codigo INTEGER NOT NULL,
+                    produto TEXT,
+                    oferta NUMERIC(10, 2),
+                    data_inicio DATE NOT NULL,
+                    data_final DATE NOT NULL,
+                    UNIQUE(codigo, data_inicio, data_final)
+                )
+            """))
+
+            # --- vigência das ofertas como daterange (consultas "qual oferta vale na data D") ---
+            criar_vigencia_ofertas(conn)
+            conn.execute(text("CREATE INDEX IF NOT EXISTS idx_ofertas_vigencia ON ofertas USING gist (vigencia)"))
+            # Só as ofertas antigas com período invertido (listadas para correção)
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_ofertas_periodo_invertido
+                ON ofertas (data_final) WHERE data_final < data_inicio
+            """))
+            criar_indices_vigencia_ofertas(conn)
+
+            # --- staging do upload de ofertas (UNLOGGED: é só área de trabalho) ---
+            conn.execute(text("""
+                CREATE UNLOGGED TABLE IF NOT EXISTS ofertas_staging (
+                    lote_id TEXT NOT NULL,
+                    linha INTEGER NOT NULL,
+                    codigo INTEGER NOT NULL,
+                    produto TEXT,
+                    oferta NUMERIC(10, 2),
+                    data_inicio DATE NOT NULL,
+                    data_final DATE NOT NULL,
+                    criado_em TIMESTAMP NOT NULL DEFAULT now()
+                )
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS idx_ofertas_staging_lote
+                ON ofertas_staging (lote_id, codigo, data_inicio, data_final)
+            """))
+            
+        return True
+            
+    except Exception as e:
+        if "foreign key constraint" not in str(e) and "does not exist" not in str(e):
+             st.error(f"Erro ao inicializar o banco de dados: {e}")
+        return False
+
+
+def limpar_chamados_antigos():
+    """Lógica de Auto-Deleção (Limpeza de 7 dias Contato)."""
+    try:
+        with engine.begin() as conn:
+            seven_days_ago = (datetime.now() - timedelta(days=7)).strftime('%Y-%m-%d %H:%M:%S')
+            
+            conn.execute(text("""
+                DELETE FROM contato_chamados 
+                WHERE ultimo_update < :seven_days_ago
+            """), {"seven_days_ago": seven_days_ago})
+            notificar_contato(conn)
+        invalidar_contagens()
+    except Exception as e:
+        if "foreign key constraint" not in str(e) and "does not exist" not in str(e):
+             st.error(f"Erro ao limpar chamados antigos: {e}")
+
+# =========================================================
+# LOGIN E PERFIL DE USUÁRIO
+# =========================================================
+def check_login_and_get_roles(username, password):
+    with engine.connect() as conn:
+        query = text("SELECT password, role, lojas_acesso FROM users WHERE username = :username")
+        result = conn.execute(query, {"username": username.lower()})
+        data = result.fetchone()
+
+    if data:
+        hashed_password, role, lojas_acesso_json = data
+        if check_hashes(password, hashed_password):
+            lojas = []
+            if lojas_acesso_json:
+                try:
+                    lojas = json.loads(lojas_acesso_json)
+                except json.JSONDecodeError:
+                    lojas = []
+            return True, (role or "user"), lojas
+    return False, "user", []
+
+
+def update_user_status(username, status):
+    current_time = datetime.now()
+    query = text("""
+        UPDATE users 
+        SET ultimo_acesso = :time, status_logado = :status 
+        WHERE username = :username
+    """)
+    
+    with engine.begin() as conn:
+        conn.execute(query, {
+            "time": current_time, 
+            "status": status, 
+            "username": username.lower()
+        })
+
+# =========================================================
+# TELA DE LOGIN
+# =========================================================
+def login_page():
+    st.title("🔐 Login do Sistema")
+    username = st.text_input("Usuário:").lower()
+    senha = st.text_input("Senha:", type="password")
+
+    if st.button("Entrar", type="primary"):
+        logged_in, role, lojas = check_login_and_get_roles(username, senha)
+        if logged_in:
+            st.session_state["logged_in"] = True
+            st.session_state["username"] = username
+            st.session_state["role"] = role
+            st.session_state["lojas_acesso"] = lojas
+            update_user_status(username, "LOGADO")
+            st.rerun()
+        else:
+            st.error("Usuário ou senha inválidos.")
+    st.stop()
+
+# =========================================================
+# FUNÇÃO DE PRIMEIRO ACESSO (BOOTSTRAP)
+# =========================================================
+def check_if_first_run(engine):
+    """Verifica se existe algum usuário no banco (None se a verificação falhar)."""
+    try:
+        with engine.connect() as conn:
+            query = text("SELECT COUNT(username) FROM users")
+            result = conn.execute(query)
+            count = result.scalar_one_or_none() or 0
+        return count == 0
+    except Exception as e:
+        if "does not exist" in str(e): # Se a tabela 'users' ainda não foi criada
+            return True
+        st.error(f"Erro ao verificar contagem de usuários: {e}")
+        return None
+
+# =========================================================
+# FUNÇÃO DE CONTAGEM DE MENSAGENS
+# =========================================================
+def get_unread_message_count(engine, username, role):
+    """
+    Contagem de não lidos servida do mapa do processo (services/notificacoes.py).
+    Com o listener ativo o mapa é atualizado via LISTEN/NOTIFY; sem ele, um único
+    GROUP BY por intervalo recarrega o mapa para todas as sessões.
+    """
+    iniciar_listener(engine)
+    if not listener_ativo():
+        atualizar_contagens_se_expirado(engine)
+    return get_unread_count(username, role)
+
+# =========================================================
+# MAIN APP
+# =========================================================
+def main():
+    iniciar_contagem_queries()
+
+    # Schema e limpeza: uma vez por processo (limpeza no máximo 1x por dia),
+    # não a cada rerun
+    garantir_schema(create_db_tables)
+    executar_periodicamente("limpeza_chamados", 24 * 60 * 60, limpar_chamados_antigos)
+    # Carrega datasets e ofertas em segundo plano antes do primeiro pedido
+    aquecer_na_partida(engine, BASE_DATA_PATH)
+    
+    is_first_run = is_primeiro_acesso(lambda: check_if_first_run(engine))
+
+    if "logged_in" not in st.session_state:
+        st.session_state["logged_in"] = False
+
+    if is_first_run:
+        st.warning("🚀 Bem-vindo! Detectamos que este é o primeiro acesso.")
+        st.info("Por favor, crie o primeiro usuário administrador do sistema.")
+        carregar_pagina("admin")(engine=engine, base_data_path=BASE_DATA_PATH)
+        st.stop() 
+
+    if not st.session_state["logged_in"]:
+        login_page() 
+
+    # --- O RESTO DA PÁGINA (SÓ RODA SE LOGADO) ---
+    # Heartbeat: anota a atividade em memória; a gravação é agrupada por processo
+    iniciar_heartbeat(engine)
+    registrar_atividade(st.session_state["username"])
+
+    st.sidebar.success(f"Logado como: {st.session_state['username']}")
+
+    if st.sidebar.button("Logout"):
+        descartar_atividade(st.session_state["username"])
+        update_user_status(st.session_state["username"], "DESLOGADO")
+        st.session_state.clear()
+        st.session_state["logged_in"] = False
+        st.rerun()
+
+    # --- Lógica de Notificação de Contato ---
+    username = st.session_state.get("username", "")
+    role = st.session_state.get("role", "user")
+    
+    unread_count = get_unread_message_count(engine, username, role)
+    
+    contato_menu_label = "Contato"
+    if unread_count > 0:
+        contato_menu_label = f"Contato ({unread_count}) 🔴"
+
+    # --- MENU LATERAL ---
+    paginas_disponiveis_labels = {
+        "Home": "home",
+        "Consulta de Estoque CD": "consulta",
+        # "Histórico de Transferencia CD": show_historico_page, # REMOVIDO
+        "Ofertas Atuais": "ver_ofertas",
+        "Alterar Senha": "mudar_senha",
+        contato_menu_label: "contato", 
+    }
+
+    if st.session_state.get("lojas_acesso"):
+        paginas_disponiveis_labels["Digitar Pedidos"] = "pedidos"
+
+    if st.session_state.get("role") == "mkt":
+        paginas_disponiveis_labels["Upload Ofertas"] = "upload_ofertas"
+    
+    if st.session_state.get("role") == "admin":
+        paginas_disponiveis_labels["Aprovação de Pedidos"] = "aprovacao"
+        paginas_disponiveis_labels["Consolidado CD"] = "consolidado_cd"
+        paginas_disponiveis_labels["Status do Usuário"] = "status"
+        paginas_disponiveis_labels["Administração"] = "admin"
+        paginas_disponiveis_labels["Atualização de Dependências"] = "admin_tools"
+        paginas_disponiveis_labels["Métricas do Sistema"] = "metricas"
+        if "Upload Ofertas" not in paginas_disponiveis_labels:
+            paginas_disponiveis_labels["Upload Ofertas"] = "upload_ofertas"
+
+    
+    # --- Lógica de Navegação Atualizada ---
+    page_list_labels = list(paginas_disponiveis_labels.keys())
+
+    if "page_key" not in st.session_state:
+        st.session_state.page_key = "Home"
+    
+    if st.session_state.page_key not in page_list_labels:
+        if "Contato" in st.session_state.page_key:
+            st.session_state.page_key = contato_menu_label 
+        else:
+            st.session_state.page_key = "Home" 
+
+    def update_sidebar_selection():
+        st.session_state.page_key = st.session_state["sidebar_radio_key"]
+
+    current_page_index = page_list_labels.index(st.session_state.page_key)
+
+    st.sidebar.radio(
+        "Selecione a Página:", 
+        page_list_labels, 
+        index=current_page_index,
+        on_change=update_sidebar_selection,
+        key="sidebar_radio_key"
+    )
+    
+    pagina_atual = st.session_state.page_key
+    selected_page_func = carregar_pagina(paginas_disponiveis_labels[pagina_atual])
+    try:
+        selected_page_func(engine=engine, base_data_path=BASE_DATA_PATH)
+    finally:
+        # Consultas e tempo deste rerun (bootstrap + página), para a página de métricas
+        registrar_queries_pagina(pagina_atual.split(" (")[0], get_contagem_queries(), get_tempo_rerun())
+
+
+if __name__ == "__main__":
+    main()
+
+
@@ -0,0 +1,37 @@
+"""
+Medição comum dos benchmarks: tempo de uma chamada e pico de RSS durante ela
+(menos o RSS antes dela), amostrado a cada 10 ms numa thread. Só Linux
+(lê /proc/self/statm).
+"""
+import os
+import threading
+import time
+
+INTERVALO_AMOSTRA_S = 0.01
+
+
+def _rss_mb():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 ** 2
+
+
+def medir_pico(func, *args):
+    """Roda func(*args) e devolve (segundos, pico_mb, resultado)."""
+    base = _rss_mb()
+    pico = [base]
+    parar = threading.Event()
+
+    def amostrar():
+        while not parar.wait(INTERVALO_AMOSTRA_S):
+            pico[0] = max(pico[0], _rss_mb())
+
+    amostrador = threading.Thread(target=amostrar, daemon=True)
+    amostrador.start()
+    inicio = time.perf_counter()
+    try:
+        resultado = func(*args)
+    finally:
+        segundos = time.perf_counter() - inicio
+        parar.set()
+        amostrador.join()
+    return segundos, max(pico[0], _rss_mb()) - base, resultado
@@ -0,0 +1,137 @@
+"""
+Tempo e pico de memória dos loaders e pré-processamentos dos datasets
+(Mix, Histórico, WMS) sobre os arquivos do gerar_dados_sinteticos.
+
+Uso:
+    python -m benchmarks.gerar_dados_sinteticos /tmp/dados --linhas 1000000 --excel
+    python -m benchmarks.bench_datasets /tmp/dados [--formato parquet|excel] [--repeticoes 3] [--saida r.json]
+    python -m benchmarks.bench_datasets --comparar antes.json depois.json
+
+Cada função roda num processo separado; a entrada (ex: o DataFrame cru do
+WMS para preprocess_wms_data) é preparada antes da medição. O tempo é o
+menor entre as repetições; a memória é o maior pico de RSS durante a chamada
+menos o RSS antes dela (amostrado a cada 10 ms). Os loaders com
+@dataset_cache são chamados pelo __wrapped__, sem o cache.
+O resultado vai para um JSON (padrão: PASTA/bench_<formato>_<data>.json)
+junto com a escala do manifesto, para comparar rodadas com --comparar.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+from datetime import datetime
+
+from benchmarks._medicao import medir_pico
+from benchmarks.gerar_dados_sinteticos import ARQUIVOS
+
+TERMO_BUSCA = "LEITE"
+LOJAS_BUSCA = 3
+
+
+def _caminhos(pasta_formato):
+    return {nome: os.path.join(pasta_formato, base) for nome, (base, _, _) in ARQUIVOS.items()}
+
+
+# Cada caso devolve (função, argumentos) com a entrada já carregada
+def _casos():
+    from page import consulta_estoq_cd, pedidos
+
+    def busca(c):
+        df_mix = pedidos.load_mix_data.__wrapped__(c["mix"], 0)
+        lojas_user = sorted(df_mix['Loja'].unique())[:LOJAS_BUSCA]
+        return pedidos.buscar_produtos_por_nome, (df_mix, lojas_user, TERMO_BUSCA)
+
+    return {
+        "load_mix_data": lambda c: (pedidos.load_mix_data.__wrapped__, (c["mix"], 0)),
+        "load_historico_data": lambda c: (pedidos.load_historico_data, (c["historico"], 0)),
+        "load_wms_data": lambda c: (pedidos.load_wms_data, (c["wms"], 0)),
+        "preprocess_wms_data": lambda c: (
+            consulta_estoq_cd.preprocess_wms_data, (consulta_estoq_cd.load_data.__wrapped__(c["wms"], 0),)),
+        "preprocess_mix_data": lambda c: (
+            consulta_estoq_cd.preprocess_mix_data, (consulta_estoq_cd.load_data.__wrapped__(c["mix"], 0),)),
+        "buscar_produtos_por_nome": busca,
+    }
+
+
+def _rodar(nome, pasta_formato, repeticoes, fila):
+    func, args = _casos()[nome](_caminhos(pasta_formato))
+    tempos, picos, linhas = [], [], 0
+    for _ in range(repeticoes):
+        segundos, pico_mb, resultado = medir_pico(func, *args)
+        tempos.append(segundos)
+        picos.append(pico_mb)
+        linhas = len(resultado) if resultado is not None else 0
+        del resultado
+    fila.put({"segundos": min(tempos), "pico_mb": max(picos), "linhas": linhas})
+
+
+def medir_todos(pasta, formato, repeticoes) -> dict:
+    pasta_formato = os.path.join(pasta, formato)
+    ctx = multiprocessing.get_context("spawn")
+    resultados = {}
+    print(f"== {formato} em {pasta_formato} ({repeticoes} repetição(ões)) ==")
+    for nome in _casos():
+        fila = ctx.Queue()
+        proc = ctx.Process(target=_rodar, args=(nome, pasta_formato, repeticoes, fila))
+        proc.start()
+        resultados[nome] = fila.get()
+        proc.join()
+        r = resultados[nome]
+        print(f"  {nome:<26} {r['segundos']:9.3f}s | +{r['pico_mb']:7.0f} MB RSS | {r['linhas']:>10,} linhas")
+    return resultados
+
+
+def comparar(arquivo_a, arquivo_b):
+    with open(arquivo_a) as f:
+        a = json.load(f)
+    with open(arquivo_b) as f:
+        b = json.load(f)
+    for rotulo, r in (("A", a), ("B", b)):
+        linhas = r.get("escala", {}).get("linhas", {}).get(r["formato"], {})
+        print(f"{rotulo}: {r['gerado_em']} | {r['formato']} | {linhas}")
+    print(f"  {'função':<26} {'A (s)':>9} {'B (s)':>9} {'B/A':>6} | {'A (MB)':>7} {'B (MB)':>7}")
+    for nome in a["resultados"]:
+        if nome not in b["resultados"]:
+            continue
+        ra, rb = a["resultados"][nome], b["resultados"][nome]
+        razao = rb["segundos"] / ra["segundos"] if ra["segundos"] else float("nan")
+        print(f"  {nome:<26} {ra['segundos']:9.3f} {rb['segundos']:9.3f} {razao:6.2f} "
+              f"| {ra['pico_mb']:7.0f} {rb['pico_mb']:7.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dos loaders de datasets.")
+    parser.add_argument("pasta", nargs="?", help="pasta gerada pelo gerar_dados_sinteticos")
+    parser.add_argument("--formato", choices=["parquet", "excel"], default="parquet")
+    parser.add_argument("--repeticoes", type=int, default=1)
+    parser.add_argument("--saida", help="arquivo JSON de resultados")
+    parser.add_argument("--comparar", nargs=2, metavar=("A", "B"), help="compara dois JSON de resultados")
+    args = parser.parse_args()
+
+    if args.comparar:
+        comparar(*args.comparar)
+        return
+    if not args.pasta:
+        parser.error("informe a pasta dos dados ou --comparar A B")
+
+    with open(os.path.join(args.pasta, "manifesto.json")) as f:
+        escala = json.load(f)
+    gerado_em = datetime.now()
+    resultado = {
+        "gerado_em": gerado_em.isoformat(timespec="seconds"),
+        "formato": args.formato,
+        "repeticoes": args.repeticoes,
+        "escala": escala,
+        "ambiente": {"python": platform.python_version(), "maquina": platform.machine(),
+                     "cpus": os.cpu_count()},
+        "resultados": medir_todos(args.pasta, args.formato, args.repeticoes),
+    }
+    saida = args.saida or os.path.join(args.pasta, f"bench_{args.formato}_{gerado_em:%Y%m%d_%H%M%S}.json")
+    with open(saida, "w") as f:
+        json.dump(resultado, f, indent=2)
+    print(f"Resultados em {saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Exportação XLSX dos pedidos aprovados: pd.ExcelWriter (versão anterior do to_excel)
+x escrever_xlsx (xlsxwriter em memória constante, escrita em blocos).
+
+Uso:
+    python -m benchmarks.bench_export_xlsx [linhas]
+
+Não usa banco: gera um DataFrame com as colunas de get_pedidos_aprovados_download
+(padrão 500.000 linhas). Cada método roda num processo separado; a memória
+é o pico de RSS durante a exportação menos o RSS antes dela (amostrado a cada 10 ms).
+"""
+import io
+import multiprocessing
+import sys
+
+import numpy as np
+import pandas as pd
+
+from benchmarks._medicao import medir_pico
+
+LISTA_LOJAS = ["001", "002", "003", "004", "005", "006",
+               "007", "008", "011", "012", "013", "014", "017", "018"]
+
+
+def gerar_aprovados(linhas, semente=42):
+    rng = np.random.default_rng(semente)
+    codigos = rng.integers(1_000_000, 1_005_000, linhas)
+    df = pd.DataFrame({
+        'id_pedido': np.arange(1, linhas + 1),
+        'data_pedido_str': pd.Timestamp('2025-01-01') + pd.to_timedelta(rng.integers(0, 30 * 86400, linhas), unit='s'),
+        'usuario_pedido': rng.choice(['loja001', 'loja002', 'comprador', 'admin'], linhas),
+        'codigo': codigos,
+        'produto': pd.Series(codigos).map(lambda c: f"PRODUTO SINTETICO {c} 500G"),
+        'embseparacao': rng.integers(1, 24, linhas),
+    })
+    df['data_pedido_str'] = df['data_pedido_str'].dt.strftime('%d/%m/%Y %H:%M')
+    for loja in LISTA_LOJAS:
+        df[f"loja_{loja}"] = rng.integers(0, 5, linhas)
+    df['total_cx'] = df[[f"loja_{loja}" for loja in LISTA_LOJAS]].sum(axis=1)
+    df['status_item'] = rng.choice(['Ativo', 'Inativo'], linhas)
+    return df
+
+
+def to_excel_anterior(df: pd.DataFrame) -> bytes:
+    """Cópia do to_excel antigo de page/aprovacao_pedidos.py (referência)."""
+    output = io.BytesIO()
+    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
+        df.to_excel(writer, index=False, sheet_name='PedidosAprovados')
+        worksheet = writer.sheets['PedidosAprovados']
+        for idx, col in enumerate(df):
+            series = df[col]
+            max_len = max(
+                (series.astype(str).map(len).max() or len(str(series.name))),
+                len(str(series.name))
+            ) + 2
+            worksheet.set_column(idx, idx, max_len)
+    return output.getvalue()
+
+
+def escrever_xlsx_novo(df: pd.DataFrame) -> bytes:
+    from services.excel_export import escrever_xlsx
+    return escrever_xlsx(df, 'PedidosAprovados')
+
+
+METODOS = {"pd.ExcelWriter (anterior)": to_excel_anterior, "escrever_xlsx (constant_memory)": escrever_xlsx_novo}
+
+
+def _rodar(nome, linhas, fila):
+    df = gerar_aprovados(linhas)
+    segundos, pico_mb, dados = medir_pico(METODOS[nome], df)
+    fila.put((nome, segundos, pico_mb, len(dados)))
+
+
+def main():
+    linhas = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    ctx = multiprocessing.get_context("spawn")
+    print(f"== Exportação XLSX de {linhas} linhas ==")
+    for nome in METODOS:
+        fila = ctx.Queue()
+        proc = ctx.Process(target=_rodar, args=(nome, linhas, fila))
+        proc.start()
+        nome, segundos, memoria_mb, tamanho = fila.get()
+        proc.join()
+        print(f"  {nome:<34} {segundos:8.2f}s | +{memoria_mb:7.0f} MB RSS | arquivo {tamanho / 1024 ** 2:5.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+"""
+Gera Mix, Histórico e WMS sintéticos (mesmas abas e colunas dos arquivos reais)
+para medir os loaders em escalas maiores que as de data/.
+
+Uso:
+    python -m benchmarks.gerar_dados_sinteticos PASTA [--linhas 1000000] [--lojas 14] [--datas 30] [--excel]
+
+A escala é dada pelo Histórico (o maior dos três): P produtos x N lojas x D
+datas de solicitação = --linhas (ou --produtos P direto). Os outros saem
+dos mesmos P produtos: Mix = P x N linhas, WMS = P x D linhas (uma posição
+por produto e data). Os arquivos ficam em PASTA/parquet (sempre) e
+PASTA/excel (com --excel), com os nomes que o app procura em data/, de modo
+que os loaders leem o Parquet numa pasta e caem no Excel na outra.
+PASTA/manifesto.json registra a escala para o bench_datasets.
+
+O Excel tem no máximo 1.048.575 linhas de dados: acima disso o arquivo é
+truncado (e o manifesto registra as linhas realmente escritas).
+"""
+import argparse
+import json
+import math
+import os
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from services.excel_export import escrever_xlsx
+
+LISTA_LOJAS = ["001", "002", "003", "004", "005", "006",
+               "007", "008", "011", "012", "013", "014", "017", "018"]
+
+# (base sem extensão, extensão do Excel, aba) — como em get_caminhos_dados
+ARQUIVOS = {
+    "mix": ("__MixAtivoSistema", "xlsx", "__MixAtivoSistema"),
+    "historico": ("historico_solic", "xlsm", "__solic_dia"),
+    "wms": ("WMS", "xlsm", "WMS"),
+}
+
+LIMITE_LINHAS_EXCEL = 1_048_575
+
+CATEGORIAS = ["ARROZ", "FEIJAO", "LEITE", "CAFE", "ACUCAR", "OLEO", "BISCOITO", "MACARRAO",
+              "SABAO", "DETERGENTE", "REFRIGERANTE", "SUCO", "IOGURTE", "FARINHA", "MOLHO"]
+MARCAS = ["TIO JOAO", "CAMIL", "ITALAC", "PILAO", "UNIAO", "LIZA", "PIRAQUE", "RENATA",
+          "OMO", "YPE", "GUARANA", "DEL VALLE", "NESTLE", "DONA BENTA", "POMAROLA"]
+TAMANHOS = ["200G", "500G", "1KG", "5KG", "1L", "2L", "350ML", "90G"]
+EMBALAGENS = [1, 6, 12, 20, 24]
+
+
+# =========================================================
+# TABELAS
+# =========================================================
+
+def gerar_produtos(produtos, semente=42) -> pd.DataFrame:
+    """Cadastro base: um registro por código (compartilhado pelos três arquivos)."""
+    rng = np.random.default_rng(semente)
+    nomes = (pd.Series(rng.choice(CATEGORIAS, produtos)) + " "
+             + pd.Series(rng.choice(MARCAS, produtos)) + " "
+             + pd.Series(rng.choice(TAMANHOS, produtos)))
+    return pd.DataFrame({
+        'codigo': np.arange(100_000, 100_000 + produtos),
+        'ean': 7_890_000_000_000 + rng.integers(0, 9_999_999, produtos),
+        'descricao': nomes.to_numpy(),
+        'embalagem': rng.choice(EMBALAGENS, produtos),
+        'secao': rng.integers(1, 30, produtos),
+        'grupo': rng.integers(100, 999, produtos),
+    })
+
+
+def lojas_sinteticas(n_lojas):
+    """As lojas reais primeiro; além delas, códigos 101, 102, ..."""
+    extras = [f"{100 + i:03d}" for i in range(1, max(n_lojas - len(LISTA_LOJAS), 0) + 1)]
+    return (LISTA_LOJAS + extras)[:n_lojas]
+
+
+def gerar_mix(df_prod, lojas, semente=42) -> pd.DataFrame:
+    rng = np.random.default_rng(semente + 1)
+    n = len(df_prod) * len(lojas)
+    base = df_prod.loc[df_prod.index.repeat(len(lojas))].reset_index(drop=True)
+    return pd.DataFrame({
+        'CODIGOINT': base['codigo'],
+        'CODIGOEAN': base['ean'],
+        'DESCRICAO': base['descricao'],
+        'LOJA': np.tile(np.array(lojas, dtype=int), len(df_prod)),
+        'EmbSeparacao': base['embalagem'],
+        'PPCX': rng.integers(1, 40, n).astype(float),
+        'EICX': rng.integers(0, 20, n).astype(float),
+        'CapCX': rng.integers(2, 60, n).astype(float),
+        'ltmix': 'A',
+        'SECAOOPE': base['secao'],
+        'GRUPOMERC': base['grupo'],
+    })
+
+
+def blocos_historico(df_prod, lojas, datas, semente=42):
+    """Um DataFrame por data de solicitação (P x N linhas cada)."""
+    rng = np.random.default_rng(semente + 2)
+    base = df_prod.loc[df_prod.index.repeat(len(lojas))].reset_index(drop=True)
+    n = len(base)
+    lojas_int = np.tile(np.array(lojas, dtype=int), len(df_prod))
+    for dia in datas:
+        venda_sem = rng.gamma(2.0, 3.0, n).round(1)
+        estoque = rng.integers(0, 80, n)
+        pedido = rng.integers(0, 10, n)
+        vm30 = (venda_sem * rng.uniform(3.5, 4.5, n)).round(1)
+        cob = np.divide(estoque, vm30 / 30, out=np.zeros(n), where=vm30 > 0).round(1)
+        yield pd.DataFrame({
+            'CODIGOINT': base['codigo'],
+            'Produto': base['descricao'],
+            'LOJA': lojas_int,
+            'Situacao': rng.choice(['Ativo', 'Ativo', 'Ativo', 'Inativo'], n),
+            'EmbSeparacao': base['embalagem'],
+            'PPCX': rng.integers(1, 40, n),
+            'EstCX': estoque,
+            'PedCX': pedido,
+            'Vd1sem-CX': venda_sem,
+            'Vd2sem-CX': (venda_sem * rng.uniform(1.6, 2.4, n)).round(1),
+            'VM30dCX': vm30,
+            'CobEstq-Med30d': cob,
+            'CobEstq+Ped': np.divide(estoque + pedido, vm30 / 30, out=np.zeros(n), where=vm30 > 0).round(1),
+            'CapGondCX': rng.integers(2, 60, n),
+            'SECAOOPE': base['secao'],
+            'GRUPOMERC': base['grupo'],
+            'DtSolicitacao': pd.Timestamp(dia) + pd.Timedelta(hours=7),
+        })
+
+
+def blocos_wms(df_prod, datas, semente=42):
+    """Um DataFrame por data salva (uma posição por produto)."""
+    rng = np.random.default_rng(semente + 3)
+    n = len(df_prod)
+    enderecos = pd.Series(rng.integers(1, 40, n)).astype(str).str.zfill(2) + "-" \
+        + pd.Series(rng.integers(1, 200, n)).astype(str).str.zfill(3)
+    for dia in datas:
+        yield pd.DataFrame({
+            'datasalva': pd.Timestamp(dia) + pd.Timedelta(hours=22),
+            'codigo': df_prod['codigo'],
+            'Produto': df_prod['descricao'],
+            'Qtd': rng.integers(0, 5_000, n),
+            'Lote': rng.integers(1, 99_999, n),
+            'Almoxarifado': 1,
+            'Endereço': enderecos.to_numpy(),
+        })
+
+
+# =========================================================
+# ESCRITA
+# =========================================================
+
+def escrever_parquet(blocos, caminho) -> int:
+    """Grava os blocos como row groups de um único Parquet (memória = um bloco)."""
+    linhas = 0
+    writer = None
+    try:
+        for bloco in blocos:
+            tabela = pa.Table.from_pandas(bloco, preserve_index=False)
+            if writer is None:
+                writer = pq.ParquetWriter(caminho, tabela.schema)
+            writer.write_table(tabela)
+            linhas += len(bloco)
+    finally:
+        if writer is not None:
+            writer.close()
+    return linhas
+
+
+def _ate_limite_excel(blocos, contador):
+    restante = LIMITE_LINHAS_EXCEL
+    for bloco in blocos:
+        if restante <= 0:
+            return
+        bloco = bloco.iloc[:restante]
+        restante -= len(bloco)
+        contador[0] += len(bloco)
+        yield bloco
+
+
+def escrever_excel(blocos, caminho, aba) -> int:
+    contador = [0]
+    with open(caminho, "wb") as f:
+        f.write(escrever_xlsx(_ate_limite_excel(blocos, contador), aba))
+    return contador[0]
+
+
+def gerar(pasta, produtos, n_lojas, n_datas, excel=False, data_final=None, semente=42) -> dict:
+    data_final = data_final or date.today()
+    datas = [data_final - timedelta(days=d) for d in range(n_datas - 1, -1, -1)]
+    lojas = lojas_sinteticas(n_lojas)
+    df_prod = gerar_produtos(produtos, semente)
+
+    fontes = {
+        "mix": lambda: [gerar_mix(df_prod, lojas, semente)],
+        "historico": lambda: blocos_historico(df_prod, lojas, datas, semente),
+        "wms": lambda: blocos_wms(df_prod, datas, semente),
+    }
+    formatos = ["parquet"] + (["excel"] if excel else [])
+    manifesto = {"produtos": produtos, "lojas": lojas, "datas": n_datas,
+                 "data_final": data_final.isoformat(), "semente": semente, "linhas": {}}
+
+    for formato in formatos:
+        os.makedirs(os.path.join(pasta, formato), exist_ok=True)
+        manifesto["linhas"][formato] = {}
+        for nome, (base, extensao, aba) in ARQUIVOS.items():
+            inicio = time.perf_counter()
+            if formato == "parquet":
+                caminho = os.path.join(pasta, formato, f"{base}.parquet")
+                linhas = escrever_parquet(fontes[nome](), caminho)
+            else:
+                caminho = os.path.join(pasta, formato, f"{base}.{extensao}")
+                linhas = escrever_excel(fontes[nome](), caminho, aba)
+            manifesto["linhas"][formato][nome] = linhas
+            print(f"  {formato:<8} {nome:<10} {linhas:>11,} linhas "
+                  f"{os.path.getsize(caminho) / 1024 ** 2:8.1f} MB {time.perf_counter() - inicio:8.1f}s")
+
+    with open(os.path.join(pasta, "manifesto.json"), "w") as f:
+        json.dump(manifesto, f, indent=2)
+    return manifesto
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gera Mix/Histórico/WMS sintéticos.")
+    parser.add_argument("pasta")
+    parser.add_argument("--linhas", type=int, default=1_000_000, help="linhas do Histórico (define os produtos)")
+    parser.add_argument("--produtos", type=int, help="número de produtos (ignora --linhas)")
+    parser.add_argument("--lojas", type=int, default=len(LISTA_LOJAS))
+    parser.add_argument("--datas", type=int, default=30)
+    parser.add_argument("--excel", action="store_true", help="grava também os arquivos Excel (lento)")
+    parser.add_argument("--semente", type=int, default=42)
+    args = parser.parse_args()
+
+    produtos = args.produtos or math.ceil(args.linhas / (args.lojas * args.datas))
+    print(f"== {produtos} produtos x {args.lojas} lojas x {args.datas} datas em {args.pasta} ==")
+    gerar(args.pasta, produtos, args.lojas, args.datas, excel=args.excel, semente=args.semente)
+    if args.excel and produtos * args.lojas * args.datas > LIMITE_LINHAS_EXCEL:
+        print(f"  (Excel truncado em {LIMITE_LINHAS_EXCEL:,} linhas de dados)")
+
+
+if __name__ == "__main__":
+    main()
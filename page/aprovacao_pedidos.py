@@ -1,375 +1,795 @@
-import streamlit as st
-import pandas as pd
-from sqlalchemy import text
-import io
-from datetime import datetime, timedelta, date
-
-# --- Configurações ---
-LISTA_LOJAS = ["001", "002", "003", "004", "005", "006",
-               "007", "008", "011", "012", "013", "014", "017", "018"]
-COLUNAS_LOJAS_PEDIDO = [f"loja_{loja}" for loja in LISTA_LOJAS]
-
-
-# ===========================================================
-#   FUNÇÕES DE FORMATAÇÃO E CONSULTA
-# ===========================================================
-
-def formatar_tipos_df(df: pd.DataFrame) -> pd.DataFrame:
-    """Formata tipos de dados e corrige valores numéricos."""
-    int_cols_with_zero_fallback = COLUNAS_LOJAS_PEDIDO + ['total_cx']
-    for col in int_cols_with_zero_fallback:
-        if col in df.columns:
-            df[col] = pd.to_numeric(
-                df[col], errors='coerce').fillna(0).astype(int)
-
-    if 'embseparacao' in df.columns:
-        df['embseparacao'] = pd.to_numeric(
-            df['embseparacao'], errors='coerce').fillna(0).astype(int)
-
-    # Garante que o código seja numérico para cruzamento com ofertas
-    if 'codigo' in df.columns:
-        df['codigo'] = pd.to_numeric(df['codigo'], errors='coerce').fillna(0).astype(int)
-
-    return df
-
-def get_offers_data(engine):
-    """Busca ofertas ativas ou futuras (ignora passadas)."""
-    today = date.today()
-    query = text("""
-        SELECT codigo, data_inicio, data_final
-        FROM ofertas
-        WHERE data_final >= :today
-    """)
-    try:
-        with engine.connect() as conn:
-            df = pd.read_sql_query(query, conn, params={"today": today})
-            # Remove duplicatas (caso haja) mantendo a última vigência
-            df = df.drop_duplicates(subset=['codigo'], keep='last')
-        return df
-    except Exception:
-        return pd.DataFrame(columns=['codigo', 'data_inicio', 'data_final'])
-
-def get_pedidos_para_aprovacao(engine, date_start, date_end, only_pending: bool) -> pd.DataFrame:
-    """Busca pedidos para a grade de aprovação, com filtros de data e status."""
-    try:
-        start_str = datetime.combine(
-            date_start, datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S')
-        end_str = datetime.combine(
-            date_end, datetime.max.time()).strftime('%Y-%m-%d %H:%M:%S')
-        lojas_sql = ", ".join(COLUNAS_LOJAS_PEDIDO)
-
-        query = text(f"""
-            SELECT 
-                id AS id_pedido, 
-                TO_CHAR(data_pedido, 'DD/MM/YYYY HH24:MI') AS data_pedido_str, 
-                usuario_pedido, 
-                codigo, 
-                produto, 
-                embseparacao,
-                {lojas_sql},
-                total_cx,
-                status_item,
-                status_aprovacao
-            FROM pedidos_consolidados
-            WHERE data_pedido BETWEEN :start_str AND :end_str
-        """)
-        
-        params = {"start_str": start_str, "end_str": end_str}
-
-        if only_pending:
-            query = text(str(query) + " AND status_aprovacao = 'Pendente'")
-        
-        query = text(str(query) + " ORDER BY data_pedido ASC")
-
-        df_pedidos = pd.read_sql_query(query, con=engine, params=params)
-        df_pedidos = formatar_tipos_df(df_pedidos)
-
-        # --- MUDANÇA: Cruzar com Ofertas ---
-        if not df_pedidos.empty:
-            df_ofertas = get_offers_data(engine)
-            if not df_ofertas.empty:
-                # Merge (Left Join) para trazer info da oferta
-                df_pedidos = pd.merge(df_pedidos, df_ofertas, on='codigo', how='left')
-                
-                # Formata as datas de oferta para string (DD/MM/YYYY)
-                df_pedidos['inicio_oferta'] = pd.to_datetime(df_pedidos['data_inicio']).dt.strftime('%d/%m/%Y').fillna('-')
-                df_pedidos['fim_oferta'] = pd.to_datetime(df_pedidos['data_final']).dt.strftime('%d/%m/%Y').fillna('-')
-            else:
-                df_pedidos['inicio_oferta'] = '-'
-                df_pedidos['fim_oferta'] = '-'
-        
-        return df_pedidos
-
-    except Exception as e:
-        st.error(f"Erro ao buscar pedidos para aprovação: {e}")
-        return pd.DataFrame()
-
-
-def get_pedidos_aprovados_download(engine) -> pd.DataFrame:
-    """Busca TODOS os pedidos 'Aprovados' para o download."""
-    try:
-        lojas_sql = ", ".join(COLUNAS_LOJAS_PEDIDO)
-        
-        query = text(f"""
-            SELECT 
-                id AS id_pedido, 
-                TO_CHAR(data_pedido, 'DD/MM/YYYY HH24:MI') AS data_pedido_str, 
-                usuario_pedido, 
-                codigo, 
-                produto, 
-                embseparacao,
-                {lojas_sql},
-                total_cx,
-                status_item
-            FROM pedidos_consolidados
-            WHERE status_aprovacao = 'Aprovado' 
-            ORDER BY data_pedido ASC
-        """)
-        df = pd.read_sql_query(query, con=engine)
-        df = formatar_tipos_df(df)
-        return df
-    except Exception as e:
-        st.error(f"Erro ao buscar pedidos aprovados: {e}")
-        return pd.DataFrame()
-
-
-# ===========================================================
-#   FUNÇÕES DE ATUALIZAÇÃO
-# ===========================================================
-
-def update_pedidos_aprovados(engine, df_editado_selecionado):
-    """Atualiza o banco com quantidades editadas e aprova os itens."""
-    try:
-        data_aprovacao_dt = datetime.now()
-        
-        set_lojas_sql = ", ".join(
-            [f"{col} = :{col}" for col in COLUNAS_LOJAS_PEDIDO])
-
-        query = text(f"""
-            UPDATE pedidos_consolidados
-            SET 
-                status_aprovacao = 'Aprovado',
-                data_aprovacao = :data_aprovacao,
-                total_cx = :total_cx,
-                {set_lojas_sql}
-            WHERE id = :id_pedido
-        """)
-
-        updates_list = []
-        for _, row in df_editado_selecionado.iterrows():
-            novas_lojas_vals = {col: int(pd.to_numeric(
-                row[col], errors='coerce', downcast='integer')) for col in COLUNAS_LOJAS_PEDIDO}
-            novo_total_cx = sum(novas_lojas_vals.values())
-            
-            params = {
-                "data_aprovacao": data_aprovacao_dt,
-                "total_cx": novo_total_cx,
-                "id_pedido": row['id_pedido'],
-                **novas_lojas_vals
-            }
-            updates_list.append(params)
-
-        with engine.begin() as conn:
-            conn.execute(query, updates_list)
-            
-        return True, f"{len(updates_list)} itens foram aprovados com sucesso."
-    
-    except Exception as e:
-        return False, f"Erro ao atualizar o banco de dados: {e}"
-
-
-def rejeitar_pedidos(engine, ids_pedidos: list):
-    """Atualiza o status de uma lista de pedidos para 'Rejeitado'."""
-    try:
-        data_aprovacao_dt = datetime.now()
-
-        query = text("""
-            UPDATE pedidos_consolidados
-            SET 
-                status_aprovacao = 'Rejeitado',
-                data_aprovacao = :data_aprovacao
-            WHERE id IN :ids_list
-        """)
-        
-        params = {
-            "data_aprovacao": data_aprovacao_dt,
-            "ids_list": tuple(ids_pedidos)
-        }
-
-        with engine.begin() as conn:
-            conn.execute(query, params)
-            
-        return True, f"{len(ids_pedidos)} itens foram rejeitados."
-    except Exception as e:
-        return False, f"Erro ao rejeitar pedidos: {e}"
-
-
-# ===========================================================
-#   FUNÇÃO DE EXPORTAÇÃO
-# ===========================================================
-
-def to_excel(df: pd.DataFrame) -> bytes:
-    """Exporta pedidos aprovados para Excel."""
-    output = io.BytesIO()
-    with pd.ExcelWriter(output, engine='xlsxwriter') as writer:
-        df.to_excel(writer, index=False, sheet_name='PedidosAprovados')
-        worksheet = writer.sheets['PedidosAprovados']
-        for idx, col in enumerate(df):
-            series = df[col]
-            max_len = max(
-                (series.astype(str).map(len).max() or len(str(series.name))),
-                len(str(series.name))
-            ) + 2
-            worksheet.set_column(idx, idx, max_len)
-    return output.getvalue()
-
-
-# ===========================================================
-#   PÁGINA PRINCIPAL
-# ===========================================================
-
-def show_aprovacao_page(engine, base_data_path):
-    st.title("📋 Aprovação Detalhada de Pedidos")
-    st.info(
-        "Edite as quantidades, selecione os itens e clique em 'Aprovar' ou 'Rejeitar'.")
-    st.subheader("1. Pedidos para Aprovação")
-    st.markdown("#### Filtros de Visualização")
-
-    today = datetime.now().date()
-    yesterday = today - timedelta(days=1)
-
-    col1, col2, col3 = st.columns([1, 1, 2])
-    with col1:
-        data_inicio = st.date_input("Data Início", yesterday)
-    with col2:
-        data_fim = st.date_input("Data Fim", today)
-    with col3:
-        st.write("")
-        ver_pendentes = st.checkbox(
-            "Mostrar apenas Pedidos Pendentes", value=True)
-    st.markdown("---")
-
-    df_pedidos_filtrados = get_pedidos_para_aprovacao(
-        engine, data_inicio, data_fim, ver_pendentes)
-
-    if df_pedidos_filtrados.empty:
-        st.success("Nenhum pedido encontrado para os filtros selecionados.")
-    else:
-        df_pedidos_filtrados['Selecionar'] = False
-
-        # MUDANÇA: Adicionadas as novas colunas de oferta na lista de info
-        colunas_info = [
-            'Selecionar', 'id_pedido', 'data_pedido_str', 'usuario_pedido',
-            'codigo', 'produto', 'inicio_oferta', 'fim_oferta', # <-- Novas Colunas
-            'embseparacao', 'status_item', 'status_aprovacao'
-        ]
-        colunas_editaveis = COLUNAS_LOJAS_PEDIDO
-        colunas_total = ['total_cx']
-
-        colunas_existentes = [col for col in (
-            colunas_info + colunas_editaveis + colunas_total) if col in df_pedidos_filtrados.columns]
-        df_para_editar = df_pedidos_filtrados[colunas_existentes]
-
-        column_config = {
-            "Selecionar": st.column_config.CheckboxColumn("Selecionar", default=False),
-            "id_pedido": None,
-            "data_pedido_str": st.column_config.TextColumn("Data Pedido", disabled=True),
-            "usuario_pedido": st.column_config.TextColumn("Usuário", disabled=True),
-            "codigo": st.column_config.TextColumn("Código", disabled=True),
-            "produto": st.column_config.TextColumn("Produto", width="medium", disabled=True),
-            # MUDANÇA: Configuração das colunas de oferta
-            "inicio_oferta": st.column_config.TextColumn("Início Oferta", disabled=True),
-            "fim_oferta": st.column_config.TextColumn("Fim Oferta", disabled=True),
-            "embseparacao": st.column_config.NumberColumn("Emb.", disabled=True, format="%d"),
-            "status_item": st.column_config.TextColumn("Status Mix", disabled=True),
-            "total_cx": st.column_config.NumberColumn("Total CX (Original)", disabled=True, format="%d"),
-            "status_aprovacao": None
-        }
-
-        if not ver_pendentes:
-            column_config["status_aprovacao"] = st.column_config.TextColumn(
-                "Status", disabled=True)
-
-        for col_loja in colunas_editaveis:
-            column_config[col_loja] = st.column_config.NumberColumn(
-                col_loja.replace("loja_", "Lj "), min_value=0, step=1, format="%d"
-            )
-
-        st.markdown("Edite as quantidades (em caixas) e selecione os itens:")
-        df_editado = st.data_editor(
-            df_para_editar,
-            column_config=column_config,
-            hide_index=True,
-            use_container_width=True,
-            num_rows="dynamic",
-            key="editor_aprovacao"
-        )
-        st.markdown("---")
-
-        df_selecionado = df_editado[df_editado['Selecionar'] == True]
-
-        col_btn_1, col_btn_2, col_spacer = st.columns([1, 1, 3])
-
-        with col_btn_1:
-            if st.button("Aprovar Selecionados", type="primary"):
-                if df_selecionado.empty:
-                    st.warning("Nenhum item foi selecionado para aprovar.")
-                else:
-                    df_para_aprovar = df_selecionado[df_selecionado['status_aprovacao'] == 'Pendente']
-                    if df_para_aprovar.empty:
-                        st.warning(
-                            "Nenhum item 'Pendente' foi selecionado para aprovar.")
-                    else:
-                        with st.spinner("Aprovando itens..."):
-                            success, message = update_pedidos_aprovados(
-                                engine, df_para_aprovar)
-                            if success:
-                                st.success(message)
-                                st.rerun()
-                            else:
-                                st.error(message)
-
-        with col_btn_2:
-            if st.button("Rejeitar Selecionados"):
-                if df_selecionado.empty:
-                    st.warning("Nenhum item foi selecionado para rejeitar.")
-                else:
-                    df_para_rejeitar = df_selecionado[df_selecionado['status_aprovacao'] == 'Pendente']
-                    ids_para_rejeitar = df_para_rejeitar['id_pedido'].tolist()
-                    if not ids_para_rejeitar:
-                        st.warning(
-                            "Nenhum item 'Pendente' foi selecionado para rejeitar.")
-                    else:
-                        with st.spinner("Rejeitando itens..."):
-                            success, message = rejeitar_pedidos(
-                                engine, ids_para_rejeitar)
-                            if success:
-                                st.success(message)
-                                st.rerun()
-                            else:
-                                st.error(message)
-
-        if not ver_pendentes:
-            st.info(
-                "Para aprovar ou rejeitar pedidos, marque o filtro 'Mostrar apenas Pedidos Pendentes'.")
-
-    st.markdown("---")
-
-    st.subheader("2. Baixar Relatório de Pedidos Aprovados (Todos)")
-    st.caption(
-        "Esta seção baixa TODOS os pedidos aprovados, independente do filtro de data acima.")
-
-    df_aprovados = get_pedidos_aprovados_download(engine)
-
-    if df_aprovados.empty:
-        st.info("Nenhum pedido aprovado encontrado para baixar.")
-    else:
-        st.markdown(
-            f"Encontrados **{len(df_aprovados)}** itens aprovados no banco de dados.")
-        excel_data = to_excel(df_aprovados)
-        st.download_button(
-            label="Baixar Aprovados (Excel)",
-            data=excel_data,
-            file_name=f"pedidos_aprovados_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
-            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+import streamlit as st
+import pandas as pd
+from sqlalchemy import text
+from datetime import datetime, timedelta, date
+
+from services.bulk_db import montar_unnest
+from services.excel_export import escrever_xlsx
+from services.ofertas import sql_oferta_aplicavel
+from services.pedidos_recentes import invalidar_pedidos_recentes
+
+# --- Configurações ---
+# Resumo de (id, versao) das linhas de um produto: se qualquer linha mudar,
+# entrar ou sair do conjunto, o checksum muda
+CHECKSUM_LINHAS_SQL = "md5(string_agg(id || ':' || versao, ',' ORDER BY id))"
+MODO_LINHA = "Por linha"
+MODO_AGREGADO = "Por produto (agregado)"
+LISTA_LOJAS = ["001", "002", "003", "004", "005", "006",
+               "007", "008", "011", "012", "013", "014", "017", "018"]
+COLUNAS_LOJAS_PEDIDO = [f"loja_{loja}" for loja in LISTA_LOJAS]
+
+
+# ===========================================================
+#   FUNÇÕES DE FORMATAÇÃO E CONSULTA
+# ===========================================================
+
+def formatar_tipos_df(df: pd.DataFrame) -> pd.DataFrame:
+    """Formata tipos de dados e corrige valores numéricos."""
+    int_cols_with_zero_fallback = COLUNAS_LOJAS_PEDIDO + ['total_cx']
+    for col in int_cols_with_zero_fallback:
+        if col in df.columns:
+            df[col] = pd.to_numeric(
+                df[col], errors='coerce').fillna(0).astype(int)
+
+    if 'embseparacao' in df.columns:
+        df['embseparacao'] = pd.to_numeric(
+            df['embseparacao'], errors='coerce').fillna(0).astype(int)
+
+    # Garante que o código seja numérico para cruzamento com ofertas
+    if 'codigo' in df.columns:
+        df['codigo'] = pd.to_numeric(df['codigo'], errors='coerce').fillna(0).astype(int)
+
+    return df
+
+def get_pedidos_para_aprovacao(engine, date_start, date_end, only_pending: bool) -> pd.DataFrame:
+    """
+    Busca pedidos para a grade de aprovação, com filtros de data e status.
+    A oferta vigente (ou a próxima) de cada código vem no mesmo SQL (LEFT JOIN LATERAL).
+    'versao' é a versão de cada linha no momento da leitura (controle de concorrência).
+    """
+    try:
+        start_str = datetime.combine(
+            date_start, datetime.min.time()).strftime('%Y-%m-%d %H:%M:%S')
+        end_str = datetime.combine(
+            date_end, datetime.max.time()).strftime('%Y-%m-%d %H:%M:%S')
+        lojas_sql = ", ".join([f"p.{col}" for col in COLUNAS_LOJAS_PEDIDO])
+
+        filtro_status = "AND p.status_aprovacao = 'Pendente'" if only_pending else ""
+
+        # 'codigo' é TEXT em pedidos_consolidados e INTEGER em ofertas:
+        # converte só quando é numérico, para usar o índice de ofertas(codigo, vigencia)
+        codigo_numerico = "CASE WHEN p.codigo ~ '^[0-9]{1,9}$' THEN CAST(p.codigo AS INTEGER) END"
+        oferta_sql = sql_oferta_aplicavel(codigo_numerico, incluir_futuras=True)
+
+        query = text(f"""
+            SELECT 
+                p.id AS id_pedido, 
+                TO_CHAR(p.data_pedido, 'DD/MM/YYYY HH24:MI') AS data_pedido_str, 
+                p.usuario_pedido, 
+                p.codigo, 
+                p.produto, 
+                p.embseparacao,
+                {lojas_sql},
+                p.total_cx,
+                p.status_item,
+                p.status_aprovacao,
+                p.versao,
+                COALESCE(TO_CHAR(o.data_inicio, 'DD/MM/YYYY'), '-') AS inicio_oferta,
+                COALESCE(TO_CHAR(o.data_final, 'DD/MM/YYYY'), '-') AS fim_oferta
+            FROM pedidos_consolidados p
+            LEFT JOIN LATERAL ({oferta_sql}
+            ) o ON TRUE
+            WHERE p.data_pedido BETWEEN :start_str AND :end_str
+            {filtro_status}
+            ORDER BY p.data_pedido ASC
+        """)
+        
+        params = {"start_str": start_str, "end_str": end_str, "data_oferta": date.today()}
+
+        df_pedidos = pd.read_sql_query(query, con=engine, params=params)
+        df_pedidos = formatar_tipos_df(df_pedidos)
+        return df_pedidos
+
+    except Exception as e:
+        st.error(f"Erro ao buscar pedidos para aprovação: {e}")
+        return pd.DataFrame()
+
+
+def _janela_datas(date_start, date_end):
+    return (datetime.combine(date_start, datetime.min.time()),
+            datetime.combine(date_end, datetime.max.time()))
+
+
+def get_pedidos_agregados(engine, date_start, date_end) -> pd.DataFrame:
+    """
+    Demanda pendente do período agregada por produto (GROUP BY codigo):
+    total por loja e total geral. Só as linhas agregadas vão para o navegador.
+    O 'checksum' resume (id, versao) das linhas de cada produto.
+    """
+    try:
+        inicio, fim = _janela_datas(date_start, date_end)
+        somas_lojas_sql = ", ".join([f"SUM({col}) AS {col}" for col in COLUNAS_LOJAS_PEDIDO])
+        codigo_numerico = "CASE WHEN a.codigo ~ '^[0-9]{1,9}$' THEN CAST(a.codigo AS INTEGER) END"
+        oferta_sql = sql_oferta_aplicavel(codigo_numerico, incluir_futuras=True)
+
+        query = text(f"""
+            WITH agregado AS (
+                SELECT
+                    codigo,
+                    MAX(produto) AS produto,
+                    MAX(embseparacao) AS embseparacao,
+                    COUNT(*) AS linhas,
+                    {somas_lojas_sql},
+                    SUM(total_cx) AS total_cx,
+                    {CHECKSUM_LINHAS_SQL} AS checksum
+                FROM pedidos_consolidados
+                WHERE status_aprovacao = 'Pendente'
+                  AND data_pedido BETWEEN :inicio AND :fim
+                GROUP BY codigo
+            )
+            SELECT
+                a.*,
+                COALESCE(TO_CHAR(o.data_inicio, 'DD/MM/YYYY'), '-') AS inicio_oferta,
+                COALESCE(TO_CHAR(o.data_final, 'DD/MM/YYYY'), '-') AS fim_oferta
+            FROM agregado a
+            LEFT JOIN LATERAL ({oferta_sql}
+            ) o ON TRUE
+            ORDER BY a.total_cx DESC, a.codigo
+        """)
+        params = {"inicio": inicio, "fim": fim, "data_oferta": date.today()}
+        df = pd.read_sql_query(query, con=engine, params=params)
+        # 'codigo' fica como texto: é a chave usada para aplicar a decisão
+        colunas_int = COLUNAS_LOJAS_PEDIDO + ['total_cx', 'linhas', 'embseparacao']
+        df[colunas_int] = df[colunas_int].apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
+        return df
+    except Exception as e:
+        st.error(f"Erro ao agregar pedidos por produto: {e}")
+        return pd.DataFrame()
+
+
+def get_linhas_produto(engine, codigo, date_start, date_end) -> pd.DataFrame:
+    """Detalhe (drill-down) das linhas pendentes de um produto no período."""
+    try:
+        inicio, fim = _janela_datas(date_start, date_end)
+        lojas_sql = ", ".join(COLUNAS_LOJAS_PEDIDO)
+        query = text(f"""
+            SELECT
+                id AS id_pedido,
+                TO_CHAR(data_pedido, 'DD/MM/YYYY HH24:MI') AS data_pedido_str,
+                usuario_pedido,
+                {lojas_sql},
+                total_cx
+            FROM pedidos_consolidados
+            WHERE codigo = :codigo
+              AND status_aprovacao = 'Pendente'
+              AND data_pedido BETWEEN :inicio AND :fim
+            ORDER BY data_pedido ASC
+        """)
+        df = pd.read_sql_query(query, con=engine, params={"codigo": codigo, "inicio": inicio, "fim": fim})
+        return formatar_tipos_df(df)
+    except Exception as e:
+        st.error(f"Erro ao buscar as linhas do produto: {e}")
+        return pd.DataFrame()
+
+
+def get_pedidos_aprovados_download(engine) -> pd.DataFrame:
+    """Busca TODOS os pedidos 'Aprovados' para o download."""
+    try:
+        lojas_sql = ", ".join(COLUNAS_LOJAS_PEDIDO)
+        
+        query = text(f"""
+            SELECT 
+                id AS id_pedido, 
+                TO_CHAR(data_pedido, 'DD/MM/YYYY HH24:MI') AS data_pedido_str, 
+                usuario_pedido, 
+                codigo, 
+                produto, 
+                embseparacao,
+                {lojas_sql},
+                total_cx,
+                status_item
+            FROM pedidos_consolidados
+            WHERE status_aprovacao = 'Aprovado' 
+            ORDER BY data_pedido ASC
+        """)
+        df = pd.read_sql_query(query, con=engine)
+        df = formatar_tipos_df(df)
+        return df
+    except Exception as e:
+        st.error(f"Erro ao buscar pedidos aprovados: {e}")
+        return pd.DataFrame()
+
+
+# ===========================================================
+#   FUNÇÕES DE ATUALIZAÇÃO
+# ===========================================================
+
+def calcular_alteracoes_lojas(df_original: pd.DataFrame, df_editado_selecionado: pd.DataFrame) -> pd.DataFrame:
+    """
+    Compara a seleção editada com a grade original (por id_pedido).
+    Retorna as quantidades por loja apenas nas células alteradas (NaN = sem mudança).
+    """
+    editado = df_editado_selecionado.dropna(subset=['id_pedido'])
+    editado = editado.set_index(editado['id_pedido'].astype(int))[COLUNAS_LOJAS_PEDIDO]
+    editado = editado.apply(pd.to_numeric, errors='coerce').fillna(0).astype(int)
+
+    original = df_original.set_index(df_original['id_pedido'].astype(int))[COLUNAS_LOJAS_PEDIDO]
+    original = original.reindex(editado.index)
+
+    return editado.where(editado.ne(original))
+
+
+def update_pedidos_aprovados(engine, df_editado_selecionado, df_original):
+    """
+    Aprova os itens selecionados em um único UPDATE ... FROM (conjunto de linhas).
+    Só as células de loja editadas são enviadas; o total_cx é recalculado no SQL.
+    Cada linha só é gravada se a 'versao' ainda for a lida com a grade
+    (df_original); as que mudaram nesse meio tempo voltam como conflito.
+    Retorna (sucesso, mensagem, ids_em_conflito).
+    """
+    try:
+        data_aprovacao_dt = datetime.now()
+        df_alteracoes = calcular_alteracoes_lojas(df_original, df_editado_selecionado)
+
+        if df_alteracoes.empty:
+            return False, "Nenhum item válido foi selecionado.", []
+
+        versoes = df_original.set_index(df_original['id_pedido'].astype(int))['versao']
+        ids = [int(i) for i in df_alteracoes.index]
+
+        # Uma lista por coluna (None = célula não editada, mantém o valor do banco)
+        colunas = [ids, [int(versoes[i]) for i in ids]] + [
+            [None if pd.isna(v) else int(v) for v in df_alteracoes[col]]
+            for col in COLUNAS_LOJAS_PEDIDO
+        ]
+        unnest_sql, params = montar_unnest(
+            colunas, ["INTEGER"] * (2 + len(COLUNAS_LOJAS_PEDIDO)))
+
+        lojas_sql = ", ".join(COLUNAS_LOJAS_PEDIDO)
+        set_lojas_sql = ", ".join(
+            [f"{col} = COALESCE(v.{col}, p.{col})" for col in COLUNAS_LOJAS_PEDIDO])
+        total_sql = " + ".join(
+            [f"COALESCE(v.{col}, p.{col}, 0)" for col in COLUNAS_LOJAS_PEDIDO])
+
+        query = text(f"""
+            UPDATE pedidos_consolidados AS p
+            SET 
+                status_aprovacao = 'Aprovado',
+                data_aprovacao = :data_aprovacao,
+                versao = p.versao + 1,
+                total_cx = {total_sql},
+                {set_lojas_sql}
+            FROM {unnest_sql} AS v(id_pedido, versao, {lojas_sql})
+            WHERE p.id = v.id_pedido
+              AND p.versao = v.versao
+            RETURNING p.id
+        """)
+        params["data_aprovacao"] = data_aprovacao_dt
+
+        with engine.begin() as conn:
+            gravados = set(conn.execute(query, params).scalars())
+        invalidar_pedidos_recentes()
+
+        conflitos = [i for i in ids if i not in gravados]
+        qtd_editados = int(df_alteracoes.loc[list(gravados)].notna().any(axis=1).sum())
+        return True, (f"{len(gravados)} itens foram aprovados com sucesso "
+                      f"({qtd_editados} com quantidades alteradas)."), conflitos
+    
+    except Exception as e:
+        return False, f"Erro ao atualizar o banco de dados: {e}", []
+
+
+def rejeitar_pedidos(engine, ids_pedidos: list, versoes: list):
+    """
+    Atualiza o status de uma lista de pedidos para 'Rejeitado', só nas linhas
+    cuja 'versao' ainda é a lida com a grade.
+    Retorna (sucesso, mensagem, ids_em_conflito).
+    """
+    try:
+        data_aprovacao_dt = datetime.now()
+        ids = [int(i) for i in ids_pedidos]
+        unnest_sql, params = montar_unnest([ids, [int(v) for v in versoes]], ["INTEGER", "INTEGER"])
+
+        query = text(f"""
+            UPDATE pedidos_consolidados AS p
+            SET 
+                status_aprovacao = 'Rejeitado',
+                data_aprovacao = :data_aprovacao,
+                versao = p.versao + 1
+            FROM {unnest_sql} AS v(id_pedido, versao)
+            WHERE p.id = v.id_pedido
+              AND p.versao = v.versao
+            RETURNING p.id
+        """)
+        params["data_aprovacao"] = data_aprovacao_dt
+
+        with engine.begin() as conn:
+            gravados = set(conn.execute(query, params).scalars())
+        invalidar_pedidos_recentes()
+
+        conflitos = [i for i in ids if i not in gravados]
+        return True, f"{len(gravados)} itens foram rejeitados.", conflitos
+    except Exception as e:
+        return False, f"Erro ao rejeitar pedidos: {e}", []
+
+
+# CTE 'inalterados': os produtos de 'v' (codigo, checksum) cujas linhas
+# pendentes no período ainda têm o checksum visto na grade
+SQL_PRODUTOS_INALTERADOS = f"""
+    atuais AS (
+        SELECT codigo, {CHECKSUM_LINHAS_SQL} AS checksum
+        FROM pedidos_consolidados
+        WHERE status_aprovacao = 'Pendente'
+          AND data_pedido BETWEEN :inicio AND :fim
+          AND codigo IN (SELECT codigo FROM v)
+        GROUP BY codigo
+    ), inalterados AS (
+        SELECT v.* FROM v JOIN atuais a ON a.codigo = v.codigo AND a.checksum = v.checksum
+    )
+"""
+
+
+def _travar_linhas_pendentes(conn, codigos, inicio, fim):
+    """
+    Trava (FOR UPDATE, em ordem de id) as linhas pendentes do período dos
+    produtos. A instrução seguinte da transação já vê essas linhas na versão
+    mais recente, e ninguém as altera até o COMMIT: checksum, totais e UPDATE
+    enxergam o mesmo conjunto de linhas.
+    """
+    conn.execute(text("""
+        SELECT id FROM pedidos_consolidados
+        WHERE codigo = ANY(CAST(:codigos AS TEXT[]))
+          AND status_aprovacao = 'Pendente'
+          AND data_pedido BETWEEN :inicio AND :fim
+        ORDER BY id
+        FOR UPDATE
+    """), {"codigos": list(codigos), "inicio": inicio, "fim": fim})
+
+
+class _GravacaoParcial(Exception):
+    """Algum produto teria só parte das linhas gravadas: a transação é desfeita."""
+
+    def __init__(self, codigos):
+        super().__init__(codigos)
+        self.codigos = codigos
+
+
+def _gravar_por_produto(conn, query, params):
+    """
+    Executa o UPDATE por produto (RETURNING codigo, linhas esperadas do
+    produto) e confere se todas as linhas de cada produto foram gravadas.
+    Retorna {codigo: itens gravados}; levanta _GravacaoParcial se não.
+    """
+    gravados, esperados = {}, {}
+    for codigo, linhas in conn.execute(query, params):
+        gravados[codigo] = gravados.get(codigo, 0) + 1
+        esperados[codigo] = linhas
+    parciais = [c for c, n in gravados.items() if n != esperados[c]]
+    if parciais:
+        raise _GravacaoParcial(parciais)
+    return gravados
+
+
+def aprovar_produtos_agregados(engine, ajustes: pd.DataFrame, date_start, date_end):
+    """
+    Aprova todas as linhas pendentes do período dos produtos em 'ajustes'
+    (colunas codigo, fator, teto_cx) num único UPDATE.
+    Cada loja recebe ROUND(qtd * fator); se o total do produto passar do teto,
+    as quantidades são reduzidas na proporção (FLOOR, para nunca passar do teto).
+    Um produto só é aprovado se o checksum das suas linhas ainda for o da
+    grade (coluna 'checksum'); senão volta como conflito. As linhas são
+    travadas antes, então um produto é aprovado inteiro ou não é aprovado.
+    Retorna (sucesso, mensagem, codigos_em_conflito).
+    """
+    try:
+        if ajustes.empty:
+            return False, "Nenhum produto foi selecionado.", []
+
+        inicio, fim = _janela_datas(date_start, date_end)
+        unnest_sql, params = montar_unnest(
+            [ajustes['codigo'].astype(str).tolist(),
+             [float(f) for f in ajustes['fator']],
+             [None if pd.isna(t) else int(t) for t in ajustes['teto_cx']],
+             ajustes['checksum'].tolist()],
+            ["TEXT", "NUMERIC", "INTEGER", "TEXT"])
+
+        escalado_sql = ", ".join(
+            [f"ROUND(COALESCE(p.{col}, 0) * v.fator) AS {col}" for col in COLUNAS_LOJAS_PEDIDO])
+        total_escalado_sql = " + ".join(
+            [f"ROUND(COALESCE(p.{col}, 0) * v.fator)" for col in COLUNAS_LOJAS_PEDIDO])
+        final = {
+            col: f"CAST(CASE WHEN t.teto IS NOT NULL AND t.total_produto > t.teto "
+                 f"THEN FLOOR(e.{col} * t.teto / t.total_produto) ELSE e.{col} END AS INTEGER)"
+            for col in COLUNAS_LOJAS_PEDIDO
+        }
+        set_lojas_sql = ", ".join([f"{col} = {expr}" for col, expr in final.items()])
+        total_sql = " + ".join(final.values())
+
+        query = text(f"""
+            WITH v AS (
+                SELECT * FROM {unnest_sql} AS v(codigo, fator, teto, checksum)
+            ), {SQL_PRODUTOS_INALTERADOS}, escalado AS (
+                SELECT p.id, p.versao, p.codigo, {escalado_sql}, {total_escalado_sql} AS total
+                FROM pedidos_consolidados p
+                JOIN inalterados v ON v.codigo = p.codigo
+                WHERE p.status_aprovacao = 'Pendente'
+                  AND p.data_pedido BETWEEN :inicio AND :fim
+            ), totais AS (
+                SELECT e.codigo, SUM(e.total) AS total_produto, MAX(v.teto) AS teto,
+                       COUNT(*) AS linhas
+                FROM escalado e JOIN v ON v.codigo = e.codigo
+                GROUP BY e.codigo
+            )
+            UPDATE pedidos_consolidados AS p
+            SET
+                status_aprovacao = 'Aprovado',
+                data_aprovacao = :data_aprovacao,
+                versao = p.versao + 1,
+                total_cx = {total_sql},
+                {set_lojas_sql}
+            FROM escalado e
+            JOIN totais t ON t.codigo = e.codigo
+            WHERE p.id = e.id
+              AND p.versao = e.versao
+            RETURNING p.codigo, t.linhas
+        """)
+        params.update({"inicio": inicio, "fim": fim, "data_aprovacao": datetime.now()})
+        codigos = ajustes['codigo'].astype(str).tolist()
+
+        try:
+            with engine.begin() as conn:
+                _travar_linhas_pendentes(conn, codigos, inicio, fim)
+                aprovados = _gravar_por_produto(conn, query, params)
+        except _GravacaoParcial as parcial:
+            return True, "Nenhum produto foi aprovado (nada foi gravado).", parcial.codigos
+        invalidar_pedidos_recentes()
+
+        conflitos = [c for c in codigos if c not in aprovados]
+        return True, (f"{len(aprovados)} produto(s) aprovado(s) por inteiro "
+                      f"({sum(aprovados.values())} itens)."), conflitos
+    except Exception as e:
+        return False, f"Erro ao aprovar por produto: {e}", []
+
+
+def rejeitar_produtos_agregados(engine, codigos: list, checksums: list, date_start, date_end):
+    """
+    Rejeita todas as linhas pendentes do período dos produtos informados,
+    só nos produtos cujo checksum ainda é o da grade (com as linhas travadas,
+    como na aprovação).
+    Retorna (sucesso, mensagem, codigos_em_conflito).
+    """
+    try:
+        inicio, fim = _janela_datas(date_start, date_end)
+        codigos = [str(c) for c in codigos]
+        unnest_sql, params = montar_unnest([codigos, list(checksums)], ["TEXT", "TEXT"])
+        query = text(f"""
+            WITH v AS (
+                SELECT * FROM {unnest_sql} AS v(codigo, checksum)
+            ), {SQL_PRODUTOS_INALTERADOS}, linhas AS (
+                SELECT p.codigo, COUNT(*) AS linhas
+                FROM pedidos_consolidados p
+                JOIN inalterados v ON v.codigo = p.codigo
+                WHERE p.status_aprovacao = 'Pendente'
+                  AND p.data_pedido BETWEEN :inicio AND :fim
+                GROUP BY p.codigo
+            )
+            UPDATE pedidos_consolidados AS p
+            SET status_aprovacao = 'Rejeitado', data_aprovacao = :data_aprovacao,
+                versao = p.versao + 1
+            FROM linhas l
+            WHERE p.codigo = l.codigo
+              AND p.status_aprovacao = 'Pendente'
+              AND p.data_pedido BETWEEN :inicio AND :fim
+            RETURNING p.codigo, l.linhas
+        """)
+        params.update({"inicio": inicio, "fim": fim, "data_aprovacao": datetime.now()})
+
+        try:
+            with engine.begin() as conn:
+                _travar_linhas_pendentes(conn, codigos, inicio, fim)
+                rejeitados = _gravar_por_produto(conn, query, params)
+        except _GravacaoParcial as parcial:
+            return True, "Nenhum produto foi rejeitado (nada foi gravado).", parcial.codigos
+        invalidar_pedidos_recentes()
+
+        conflitos = [c for c in codigos if c not in rejeitados]
+        return True, (f"{len(rejeitados)} produto(s) rejeitado(s) por inteiro "
+                      f"({sum(rejeitados.values())} itens)."), conflitos
+    except Exception as e:
+        return False, f"Erro ao rejeitar por produto: {e}", []
+
+
+# ===========================================================
+#   FUNÇÃO DE EXPORTAÇÃO
+# ===========================================================
+
+def to_excel(df: pd.DataFrame) -> bytes:
+    """Exporta pedidos aprovados para Excel (xlsxwriter em memória constante)."""
+    return escrever_xlsx(df, 'PedidosAprovados')
+
+
+# ===========================================================
+#   MODOS DE APROVAÇÃO
+# ===========================================================
+# Concorrência otimista: cada grade é lida uma vez por conjunto de filtros e
+# fica na sessão, então a versão conferida no UPDATE é a que o aprovador está
+# vendo (e não a de um novo SELECT feito no rerun do clique). Depois de gravar,
+# ou em "Recarregar", a grade é lida de novo e o editor recomeça limpo.
+
+def _grade_da_sessao(chave, filtros, carregar):
+    grade = st.session_state.get(chave)
+    if grade is None or grade["filtros"] != filtros:
+        grade = st.session_state[chave] = {
+            "filtros": filtros,
+            "df": carregar(),
+            "carga": grade["carga"] + 1 if grade else 0,
+        }
+    return grade
+
+
+def _descartar_grade(chave):
+    if chave in st.session_state:
+        st.session_state[chave]["filtros"] = None
+
+
+def _concluir_gravacao(chave, success, message, conflitos, rotulo):
+    """Guarda o resultado (e os conflitos) para mostrar após recarregar a grade."""
+    if not success:
+        st.error(message)
+        return
+    aviso = {"sucesso": message}
+    if conflitos:
+        lista = ", ".join(str(c) for c in conflitos[:20]) + (" ..." if len(conflitos) > 20 else "")
+        aviso["conflito"] = (
+            f"{len(conflitos)} {rotulo} não foram gravados porque outro aprovador os alterou "
+            f"depois que a grade foi carregada: {lista}. A grade foi recarregada; revise e tente de novo.")
+    st.session_state["aviso_aprovacao"] = aviso
+    _descartar_grade(chave)
+    st.rerun()
+
+
+def _mostrar_aviso_aprovacao():
+    aviso = st.session_state.pop("aviso_aprovacao", None)
+    if aviso:
+        st.success(aviso["sucesso"])
+        if "conflito" in aviso:
+            st.warning(aviso["conflito"])
+
+
+def mostrar_aprovacao_por_linha(engine, data_inicio, data_fim, ver_pendentes):
+    """Grade linha a linha: edita as quantidades de cada pedido."""
+    grade = _grade_da_sessao(
+        "grade_aprovacao", (data_inicio, data_fim, ver_pendentes),
+        lambda: get_pedidos_para_aprovacao(engine, data_inicio, data_fim, ver_pendentes))
+    df_pedidos_filtrados = grade["df"].copy()
+    st.button("🔄 Recarregar grade", on_click=_descartar_grade, args=("grade_aprovacao",),
+              key="recarregar_grade_aprovacao")
+
+    if df_pedidos_filtrados.empty:
+        st.success("Nenhum pedido encontrado para os filtros selecionados.")
+    else:
+        df_pedidos_filtrados['Selecionar'] = False
+
+        # MUDANÇA: Adicionadas as novas colunas de oferta na lista de info
+        colunas_info = [
+            'Selecionar', 'id_pedido', 'data_pedido_str', 'usuario_pedido',
+            'codigo', 'produto', 'inicio_oferta', 'fim_oferta', # <-- Novas Colunas
+            'embseparacao', 'status_item', 'status_aprovacao', 'versao'
+        ]
+        colunas_editaveis = COLUNAS_LOJAS_PEDIDO
+        colunas_total = ['total_cx']
+
+        colunas_existentes = [col for col in (
+            colunas_info + colunas_editaveis + colunas_total) if col in df_pedidos_filtrados.columns]
+        df_para_editar = df_pedidos_filtrados[colunas_existentes]
+
+        column_config = {
+            "Selecionar": st.column_config.CheckboxColumn("Selecionar", default=False),
+            "id_pedido": None,
+            "data_pedido_str": st.column_config.TextColumn("Data Pedido", disabled=True),
+            "usuario_pedido": st.column_config.TextColumn("Usuário", disabled=True),
+            "codigo": st.column_config.TextColumn("Código", disabled=True),
+            "produto": st.column_config.TextColumn("Produto", width="medium", disabled=True),
+            # MUDANÇA: Configuração das colunas de oferta
+            "inicio_oferta": st.column_config.TextColumn("Início Oferta", disabled=True),
+            "fim_oferta": st.column_config.TextColumn("Fim Oferta", disabled=True),
+            "embseparacao": st.column_config.NumberColumn("Emb.", disabled=True, format="%d"),
+            "status_item": st.column_config.TextColumn("Status Mix", disabled=True),
+            "total_cx": st.column_config.NumberColumn("Total CX (Original)", disabled=True, format="%d"),
+            "status_aprovacao": None,
+            "versao": None
+        }
+
+        if not ver_pendentes:
+            column_config["status_aprovacao"] = st.column_config.TextColumn(
+                "Status", disabled=True)
+
+        for col_loja in colunas_editaveis:
+            column_config[col_loja] = st.column_config.NumberColumn(
+                col_loja.replace("loja_", "Lj "), min_value=0, step=1, format="%d"
+            )
+
+        st.markdown("Edite as quantidades (em caixas) e selecione os itens:")
+        df_editado = st.data_editor(
+            df_para_editar,
+            column_config=column_config,
+            hide_index=True,
+            use_container_width=True,
+            num_rows="dynamic",
+            key=f"editor_aprovacao_{grade['carga']}"
+        )
+        st.markdown("---")
+
+        df_selecionado = df_editado[df_editado['Selecionar'] == True]
+
+        col_btn_1, col_btn_2, col_spacer = st.columns([1, 1, 3])
+
+        with col_btn_1:
+            if st.button("Aprovar Selecionados", type="primary"):
+                if df_selecionado.empty:
+                    st.warning("Nenhum item foi selecionado para aprovar.")
+                else:
+                    df_para_aprovar = df_selecionado[df_selecionado['status_aprovacao'] == 'Pendente']
+                    if df_para_aprovar.empty:
+                        st.warning(
+                            "Nenhum item 'Pendente' foi selecionado para aprovar.")
+                    else:
+                        with st.spinner("Aprovando itens..."):
+                            success, message, conflitos = update_pedidos_aprovados(
+                                engine, df_para_aprovar, df_para_editar)
+                        _concluir_gravacao("grade_aprovacao", success, message, conflitos, "itens")
+
+        with col_btn_2:
+            if st.button("Rejeitar Selecionados"):
+                if df_selecionado.empty:
+                    st.warning("Nenhum item foi selecionado para rejeitar.")
+                else:
+                    df_para_rejeitar = df_selecionado[df_selecionado['status_aprovacao'] == 'Pendente']
+                    ids_para_rejeitar = df_para_rejeitar['id_pedido'].tolist()
+                    if not ids_para_rejeitar:
+                        st.warning(
+                            "Nenhum item 'Pendente' foi selecionado para rejeitar.")
+                    else:
+                        with st.spinner("Rejeitando itens..."):
+                            success, message, conflitos = rejeitar_pedidos(
+                                engine, ids_para_rejeitar, df_para_rejeitar['versao'].tolist())
+                        _concluir_gravacao("grade_aprovacao", success, message, conflitos, "itens")
+
+        if not ver_pendentes:
+            st.info(
+                "Para aprovar ou rejeitar pedidos, marque o filtro 'Mostrar apenas Pedidos Pendentes'.")
+
+
+def mostrar_aprovacao_agregada(engine, data_inicio, data_fim):
+    """Uma linha por produto: fator/teto por produto, aplicado a todas as linhas pendentes."""
+    grade = _grade_da_sessao(
+        "grade_agregada", (data_inicio, data_fim),
+        lambda: get_pedidos_agregados(engine, data_inicio, data_fim))
+    df_agregado = grade["df"].copy()
+    st.button("🔄 Recarregar grade", on_click=_descartar_grade, args=("grade_agregada",),
+              key="recarregar_grade_agregada")
+
+    if df_agregado.empty:
+        st.success("Nenhum pedido pendente no período selecionado.")
+        return
+
+    st.caption(f"{len(df_agregado)} produto(s) com {int(df_agregado['linhas'].sum())} linha(s) pendente(s). "
+               "O fator multiplica as quantidades de cada loja; o teto limita o total do produto (em caixas).")
+
+    df_agregado.insert(0, 'Selecionar', False)
+    df_agregado['fator'] = 1.0
+    df_agregado['teto_cx'] = pd.Series(pd.NA, index=df_agregado.index, dtype="Int64")
+
+    colunas = (['Selecionar', 'codigo', 'produto', 'inicio_oferta', 'fim_oferta', 'embseparacao',
+                'linhas', 'total_cx', 'fator', 'teto_cx'] + COLUNAS_LOJAS_PEDIDO + ['checksum'])
+
+    column_config = {
+        "Selecionar": st.column_config.CheckboxColumn("Selecionar", default=False),
+        "codigo": st.column_config.TextColumn("Código", disabled=True),
+        "produto": st.column_config.TextColumn("Produto", width="medium", disabled=True),
+        "inicio_oferta": st.column_config.TextColumn("Início Oferta", disabled=True),
+        "fim_oferta": st.column_config.TextColumn("Fim Oferta", disabled=True),
+        "embseparacao": st.column_config.NumberColumn("Emb.", disabled=True, format="%d"),
+        "linhas": st.column_config.NumberColumn("Linhas", disabled=True, format="%d"),
+        "total_cx": st.column_config.NumberColumn("Total CX", disabled=True, format="%d"),
+        "fator": st.column_config.NumberColumn("Fator", min_value=0.0, step=0.1, format="%.2f"),
+        "teto_cx": st.column_config.NumberColumn("Teto CX", min_value=0, step=1, format="%d"),
+        "checksum": None,
+    }
+    for col_loja in COLUNAS_LOJAS_PEDIDO:
+        column_config[col_loja] = st.column_config.NumberColumn(
+            col_loja.replace("loja_", "Lj "), disabled=True, format="%d")
+
+    df_editado = st.data_editor(
+        df_agregado[colunas],
+        column_config=column_config,
+        hide_index=True,
+        use_container_width=True,
+        key=f"editor_aprovacao_agregada_{grade['carga']}"
+    )
+
+    df_selecionado = df_editado[df_editado['Selecionar'] == True]
+
+    col_btn_1, col_btn_2, col_spacer = st.columns([1, 1, 3])
+
+    with col_btn_1:
+        if st.button("Aprovar Produtos Selecionados", type="primary"):
+            if df_selecionado.empty:
+                st.warning("Nenhum produto foi selecionado para aprovar.")
+            else:
+                with st.spinner("Aprovando produtos..."):
+                    success, message, conflitos = aprovar_produtos_agregados(
+                        engine, df_selecionado[['codigo', 'fator', 'teto_cx', 'checksum']], data_inicio, data_fim)
+                _concluir_gravacao("grade_agregada", success, message, conflitos, "produtos")
+
+    with col_btn_2:
+        if st.button("Rejeitar Produtos Selecionados"):
+            if df_selecionado.empty:
+                st.warning("Nenhum produto foi selecionado para rejeitar.")
+            else:
+                with st.spinner("Rejeitando produtos..."):
+                    success, message, conflitos = rejeitar_produtos_agregados(
+                        engine, df_selecionado['codigo'].tolist(), df_selecionado['checksum'].tolist(),
+                        data_inicio, data_fim)
+                _concluir_gravacao("grade_agregada", success, message, conflitos, "produtos")
+
+    # Drill-down: as linhas de um produto só são lidas quando pedidas
+    opcoes = dict(zip(df_agregado['codigo'] + " - " + df_agregado['produto'].fillna(""), df_agregado['codigo']))
+    produto_sel = st.selectbox("Ver linhas do produto:", ["Selecione..."] + list(opcoes))
+    if produto_sel != "Selecione...":
+        df_linhas = get_linhas_produto(engine, opcoes[produto_sel], data_inicio, data_fim)
+        st.dataframe(df_linhas.drop(columns=['id_pedido']), hide_index=True, use_container_width=True)
+
+
+# ===========================================================
+#   PÁGINA PRINCIPAL
+# ===========================================================
+
+def show_aprovacao_page(engine, base_data_path):
+    st.title("📋 Aprovação Detalhada de Pedidos")
+    st.info(
+        "Edite as quantidades, selecione os itens e clique em 'Aprovar' ou 'Rejeitar'.")
+    st.subheader("1. Pedidos para Aprovação")
+    st.markdown("#### Filtros de Visualização")
+
+    today = datetime.now().date()
+    yesterday = today - timedelta(days=1)
+
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        data_inicio = st.date_input("Data Início", yesterday)
+    with col2:
+        data_fim = st.date_input("Data Fim", today)
+    with col3:
+        st.write("")
+        ver_pendentes = st.checkbox(
+            "Mostrar apenas Pedidos Pendentes", value=True)
+    modo = st.radio("Modo de aprovação:", [MODO_LINHA, MODO_AGREGADO], horizontal=True)
+    st.markdown("---")
+
+    _mostrar_aviso_aprovacao()
+    if modo == MODO_AGREGADO:
+        mostrar_aprovacao_agregada(engine, data_inicio, data_fim)
+    else:
+        mostrar_aprovacao_por_linha(engine, data_inicio, data_fim, ver_pendentes)
+
+    st.markdown("---")
+
+    st.subheader("2. Baixar Relatório de Pedidos Aprovados (Todos)")
+    st.caption(
+        "Esta seção baixa TODOS os pedidos aprovados, independente do filtro de data acima.")
+
+    df_aprovados = get_pedidos_aprovados_download(engine)
+
+    if df_aprovados.empty:
+        st.info("Nenhum pedido aprovado encontrado para baixar.")
+    else:
+        st.markdown(
+            f"Encontrados **{len(df_aprovados)}** itens aprovados no banco de dados.")
+        excel_data = to_excel(df_aprovados)
+        st.download_button(
+            label="Baixar Aprovados (Excel)",
+            data=excel_data,
+            file_name=f"pedidos_aprovados_{datetime.now().strftime('%Y%m%d_%H%M')}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
         )
\ No newline at end of file
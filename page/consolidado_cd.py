@@ -0,0 +1,156 @@
+import streamlit as st
+import pandas as pd
+from sqlalchemy import text
+import io
+from datetime import datetime, timedelta
+
+from page.aprovacao_pedidos import COLUNAS_LOJAS_PEDIDO
+from services.excel_export import escrever_xlsx
+
+# ===========================================================
+#   CONSOLIDADO DE SEPARAÇÃO (CD)
+# ===========================================================
+# Lista de separação produto x loja dos pedidos aprovados numa janela de
+# data de aprovação. Todo o pivot/agregação é feito no Postgres (índice
+# idx_pedidos_status_aprovacao_data); a linha TOTAL vem do mesmo GROUP BY
+# (GROUPING SETS). Os cabeçalhos já saem com os nomes finais, então o CSV
+# (COPY ... TO STDOUT), o Parquet e o XLSX têm as mesmas colunas.
+
+FORMATOS_EXPORTACAO = {
+    "CSV": ("csv", "text/csv"),
+    "Parquet": ("parquet", "application/octet-stream"),
+    "Excel (XLSX)": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+
+def _nome_coluna_loja(col):
+    return col.replace("loja_", "Lj ")
+
+
+def sql_consolidado():
+    lojas_sql = ",\n                ".join(
+        [f'SUM(COALESCE({col}, 0)) AS "{_nome_coluna_loja(col)}"' for col in COLUNAS_LOJAS_PEDIDO])
+    return text(f"""
+        SELECT
+            CASE WHEN GROUPING(codigo) = 1 THEN 'TOTAL' ELSE codigo END AS "Código",
+            CASE WHEN GROUPING(codigo) = 0 THEN MAX(produto) END AS "Produto",
+            CASE WHEN GROUPING(codigo) = 0 THEN MAX(embseparacao) END AS "Emb.",
+            {lojas_sql},
+            SUM(COALESCE(total_cx, 0)) AS "Total CX",
+            SUM(COALESCE(total_cx, 0) * COALESCE(embseparacao, 0)) AS "Total Unidades",
+            COUNT(*) AS "Linhas"
+        FROM pedidos_consolidados
+        WHERE status_aprovacao = 'Aprovado'
+          AND data_aprovacao >= :inicio
+          AND data_aprovacao < :fim
+        GROUP BY GROUPING SETS ((codigo), ())
+        HAVING COUNT(*) > 0
+        ORDER BY GROUPING(codigo), MAX(produto), codigo
+    """)
+
+
+def _janela_aprovacao(data_inicio, data_fim):
+    """Intervalo [início do primeiro dia, início do dia seguinte ao último)."""
+    return {
+        "inicio": datetime.combine(data_inicio, datetime.min.time()),
+        "fim": datetime.combine(data_fim + timedelta(days=1), datetime.min.time()),
+    }
+
+
+def get_consolidado(engine, data_inicio, data_fim) -> pd.DataFrame:
+    """Consolidado produto x loja (caixas) dos pedidos aprovados na janela."""
+    try:
+        with engine.connect() as conn:
+            df = pd.read_sql_query(sql_consolidado(), conn, params=_janela_aprovacao(data_inicio, data_fim))
+        # A linha TOTAL não tem embalagem: mantém a coluna inteira mesmo com o nulo
+        return df.astype({"Emb.": "Int64"})
+    except Exception as e:
+        st.error(f"Erro ao gerar o consolidado: {e}")
+        return pd.DataFrame()
+
+
+# ===========================================================
+#   EXPORTAÇÃO
+# ===========================================================
+
+def exportar_csv(engine, data_inicio, data_fim) -> bytes:
+    """CSV gerado pelo próprio Postgres (COPY ... TO STDOUT), sem passar pelo pandas."""
+    query = sql_consolidado().bindparams(**_janela_aprovacao(data_inicio, data_fim))
+    sql_literal = query.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    buffer = io.BytesIO()
+    with engine.connect() as conn:
+        with conn.connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY ({sql_literal}) TO STDOUT WITH (FORMAT csv, HEADER)", buffer)
+    return buffer.getvalue()
+
+
+def exportar_parquet(df: pd.DataFrame) -> bytes:
+    buffer = io.BytesIO()
+    df.to_parquet(buffer, index=False)
+    return buffer.getvalue()
+
+
+def exportar_xlsx(df: pd.DataFrame) -> bytes:
+    return escrever_xlsx(df, 'ConsolidadoCD', congelar=(1, 3))
+
+
+# ===========================================================
+#   PÁGINA PRINCIPAL
+# ===========================================================
+
+def show_consolidado_page(engine, base_data_path):
+    st.title("📦 Consolidado de Separação (CD)")
+    st.info("Caixas por produto e por loja dos pedidos aprovados no período de aprovação escolhido.")
+
+    today = datetime.now().date()
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        data_inicio = st.date_input("Aprovados de", today)
+    with col2:
+        data_fim = st.date_input("Até", today)
+    with col3:
+        formato = st.radio("Formato:", list(FORMATOS_EXPORTACAO), horizontal=True)
+
+    if data_fim < data_inicio:
+        st.warning("A data final deve ser igual ou posterior à inicial.")
+        st.stop()
+
+    df_consolidado = get_consolidado(engine, data_inicio, data_fim)
+
+    if df_consolidado.empty:
+        st.info("Nenhum pedido aprovado no período selecionado.")
+        return
+
+    total = df_consolidado.iloc[-1]
+    c1, c2, c3 = st.columns(3)
+    c1.metric("Produtos", len(df_consolidado) - 1)
+    c2.metric("Total de Caixas", f"{int(total['Total CX']):,}".replace(",", "."))
+    c3.metric("Total de Unidades", f"{int(total['Total Unidades']):,}".replace(",", "."))
+
+    st.dataframe(df_consolidado, hide_index=True, use_container_width=True)
+
+    # O arquivo só é gerado no clique (o COPY do CSV repete a agregação
+    # inteira): fica na sessão para o período/formato em que foi gerado
+    extensao, mime = FORMATOS_EXPORTACAO[formato]
+    chave = (formato, data_inicio, data_fim)
+    if st.button(f"Gerar arquivo ({formato})"):
+        with st.spinner("Gerando o arquivo..."):
+            if extensao == "csv":
+                dados = exportar_csv(engine, data_inicio, data_fim)
+            elif extensao == "parquet":
+                dados = exportar_parquet(df_consolidado)
+            else:
+                dados = exportar_xlsx(df_consolidado)
+        st.session_state["arquivo_consolidado"] = {
+            "chave": chave, "dados": dados, "gerado_em": datetime.now()}
+
+    arquivo = st.session_state.get("arquivo_consolidado")
+    if arquivo and arquivo["chave"] == chave:
+        st.download_button(
+            label=f"Baixar Consolidado ({formato})",
+            data=arquivo["dados"],
+            file_name=f"consolidado_cd_{data_inicio:%Y%m%d}_{data_fim:%Y%m%d}.{extensao}",
+            mime=mime,
+        )
+        st.caption(f"Arquivo gerado às {arquivo['gerado_em']:%H:%M:%S}; "
+                   "gere de novo para incluir aprovações mais recentes.")
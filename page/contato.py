@@ -3,6 +3,8 @@ from sqlalchemy import text
 from datetime import datetime
 import pandas as pd # <--- ESTA LINHA ESTAVA FALTANDO NO SEU DEPLOY
 
+from services.notificacoes import notificar_contato, invalidar_contagens
+
 # =========================================================
 # FUNÇÕES DE BANCO DE DADOS (Específicas do Contato)
 # =========================================================
@@ -48,48 +50,71 @@ def create_new_ticket(engine, username, assunto, mensagem):
             result = conn.execute(query_ticket, {"username": username, "assunto": assunto, "now": now})
             new_ticket_id = result.scalar_one()
             
-            # 2. Insere a primeira mensagem
+            # 2. Insere a primeira mensagem (data_envio = DEFAULT now() do banco)
             query_msg = text("""
-                INSERT INTO contato_mensagens (chamado_id, remetente_username, mensagem, data_envio)
-                VALUES (:chamado_id, :username, :mensagem, :now)
+                INSERT INTO contato_mensagens (chamado_id, remetente_username, mensagem)
+                VALUES (:chamado_id, :username, :mensagem)
             """)
             conn.execute(query_msg, {
                 "chamado_id": new_ticket_id,
                 "username": username,
-                "mensagem": mensagem,
-                "now": now
+                "mensagem": mensagem
             })
+
+            # 3. Avisa os processos do app (badge de não lidos)
+            notificar_contato(conn, username)
+        invalidar_contagens()
         return True, new_ticket_id
     except Exception as e:
         return False, f"Erro ao criar chamado: {e}"
 
-def get_ticket_messages(engine, ticket_id):
-    """Busca todas as mensagens de um ticket específico."""
-    query = text("""
-        SELECT remetente_username, mensagem, data_envio 
+# --- Mensagens do chat (paginadas por (data_envio, id), índice idx_contato_mensagens_chamado_envio;
+#     as novas vêm por id, que não depende de relógio) ---
+MENSAGENS_POR_PAGINA = 30
+
+def _buscar_mensagens(engine, ticket_id, filtro, ordem, params, limite=None):
+    query = text(f"""
+        SELECT id, remetente_username, mensagem, data_envio
         FROM contato_mensagens
-        WHERE chamado_id = :ticket_id
-        ORDER BY data_envio ASC
+        WHERE chamado_id = :ticket_id {filtro}
+        ORDER BY data_envio {ordem}, id {ordem}
+        {"LIMIT :limite" if limite else ""}
     """)
     with engine.connect() as conn:
-        df = pd.read_sql_query(query, conn, params={"ticket_id": ticket_id})
-    return df
+        rows = conn.execute(query, {"ticket_id": ticket_id, "limite": limite, **params}).mappings().all()
+    return [dict(r) for r in rows]
+
+def get_ultimas_mensagens(engine, ticket_id, limite=MENSAGENS_POR_PAGINA):
+    """As 'limite' mensagens mais recentes (em ordem cronológica) e se há mais antigas."""
+    rows = _buscar_mensagens(engine, ticket_id, "", "DESC", {}, limite + 1)
+    return rows[:limite][::-1], len(rows) > limite
+
+def get_mensagens_anteriores(engine, ticket_id, primeira, limite=MENSAGENS_POR_PAGINA):
+    """Página de mensagens anteriores à 'primeira' já carregada."""
+    rows = _buscar_mensagens(
+        engine, ticket_id, "AND (data_envio, id) < (:data_envio, :id)", "DESC",
+        {"data_envio": primeira['data_envio'], "id": primeira['id']}, limite + 1)
+    return rows[:limite][::-1], len(rows) > limite
+
+def get_mensagens_novas(engine, ticket_id, ultimo_id):
+    """Só as mensagens com id maior que 'ultimo_id' (o maior já carregado)."""
+    return _buscar_mensagens(
+        engine, ticket_id, "AND id > :ultimo_id", "ASC", {"ultimo_id": ultimo_id})
 
 def add_message_to_ticket(engine, ticket_id, username, mensagem, new_status):
     """Adiciona uma nova mensagem e atualiza o status do ticket."""
     now = datetime.now()
     try:
         with engine.begin() as conn:
-            # 1. Adiciona a mensagem
+            # 1. Adiciona a mensagem (data_envio = DEFAULT now() do banco)
             query_msg = text("""
-                INSERT INTO contato_mensagens (chamado_id, remetente_username, mensagem, data_envio)
-                VALUES (:chamado_id, :username, :mensagem, :now)
+                INSERT INTO contato_mensagens (chamado_id, remetente_username, mensagem)
+                VALUES (:chamado_id, :username, :mensagem)
             """)
             conn.execute(query_msg, {
                 "chamado_id": ticket_id,
                 "username": username,
-                "mensagem": mensagem,
-                "now": now
+                "mensagem": mensagem
             })
             
             # 2. Atualiza o ticket
@@ -97,12 +122,17 @@ def add_message_to_ticket(engine, ticket_id, username, mensagem, new_status):
                 UPDATE contato_chamados
                 SET status = :status, ultimo_update = :now
                 WHERE id = :ticket_id
+                RETURNING usuario_username
             """)
-            conn.execute(query_ticket, {
+            dono = conn.execute(query_ticket, {
                 "status": new_status,
                 "now": now,
                 "ticket_id": ticket_id
-            })
+            }).scalar_one_or_none()
+
+            # 3. Avisa os processos do app (badge de não lidos do dono do chamado)
+            notificar_contato(conn, dono)
+        invalidar_contagens()
         return True
     except Exception as e:
         st.error(f"Erro ao enviar mensagem: {e}")
@@ -115,8 +145,10 @@ def delete_ticket(engine, ticket_id):
         with engine.begin() as conn:
             # Graças ao "ON DELETE CASCADE" no app.py,
             # deletar o chamado também deleta as mensagens.
-            query = text("DELETE FROM contato_chamados WHERE id = :ticket_id")
-            conn.execute(query, {"ticket_id": ticket_id})
+            query = text("DELETE FROM contato_chamados WHERE id = :ticket_id RETURNING usuario_username")
+            dono = conn.execute(query, {"ticket_id": ticket_id}).scalar_one_or_none()
+            notificar_contato(conn, dono)
+        invalidar_contagens()
         return True
     except Exception as e:
         st.error(f"Erro ao excluir chamado: {e}")
@@ -126,6 +158,32 @@ def delete_ticket(engine, ticket_id):
 # INTERFACE DA PÁGINA
 # =========================================================
 
+# Buffer por chamado na sessão: {ticket_id: {"mensagens": [...], "tem_anteriores": bool}}.
+# Abrir o chamado lê só a última página; cada rerun depois disso busca apenas
+# as mensagens novas; as antigas vêm sob demanda.
+
+def _get_buffer_chat(engine, ticket_id):
+    buffers = st.session_state.setdefault('chat_buffers', {})
+    buffer = buffers.get(ticket_id)
+    if buffer is None:
+        mensagens, tem_anteriores = get_ultimas_mensagens(engine, ticket_id)
+        buffer = buffers[ticket_id] = {"mensagens": mensagens, "tem_anteriores": tem_anteriores}
+    elif buffer["mensagens"]:
+        ultimo_id = max(m['id'] for m in buffer["mensagens"])
+        buffer["mensagens"].extend(get_mensagens_novas(engine, ticket_id, ultimo_id))
+    else:
+        buffer["mensagens"], buffer["tem_anteriores"] = get_ultimas_mensagens(engine, ticket_id)
+    return buffer
+
+def carregar_mensagens_anteriores(engine, ticket_id):
+    buffer = st.session_state.get('chat_buffers', {}).get(ticket_id)
+    if buffer and buffer["mensagens"]:
+        anteriores, buffer["tem_anteriores"] = get_mensagens_anteriores(engine, ticket_id, buffer["mensagens"][0])
+        buffer["mensagens"][:0] = anteriores
+
+def descartar_buffer_chat(ticket_id):
+    st.session_state.get('chat_buffers', {}).pop(ticket_id, None)
+
 def show_chat_view(engine, ticket_id, role, username):
     """Mostra a interface de chat para um ticket selecionado."""
     
@@ -134,6 +192,7 @@ def show_chat_view(engine, ticket_id, role, username):
     
     with col1:
         if st.button("← Voltar"):
+            descartar_buffer_chat(ticket_id)
             if 'selected_ticket_id' in st.session_state:
                 del st.session_state['selected_ticket_id']
             st.rerun()
@@ -142,15 +201,20 @@ def show_chat_view(engine, ticket_id, role, username):
         # MUDANÇA: Novo botão para excluir o chamado
         if st.button("✅ Solucionado (Excluir Chamado)", type="primary"):
             if delete_ticket(engine, ticket_id):
+                descartar_buffer_chat(ticket_id)
                 st.success("Chamado excluído com sucesso!")
                 if 'selected_ticket_id' in st.session_state:
                     del st.session_state['selected_ticket_id']
                 st.rerun()
 
-    messages = get_ticket_messages(engine, ticket_id)
+    buffer = _get_buffer_chat(engine, ticket_id)
+
+    if buffer["tem_anteriores"]:
+        st.button("↑ Carregar mensagens anteriores", on_click=carregar_mensagens_anteriores,
+                  args=(engine, ticket_id))
     
     # Exibe o histórico de chat
-    for _, row in messages.iterrows():
+    for row in buffer["mensagens"]:
         avatar = "🧑‍💻" if row['remetente_username'] == username else "🛡️"
         
         # O nome exibido é o 'remetente_username' real
@@ -0,0 +1,122 @@
+import streamlit as st
+import pandas as pd
+
+from services.cache_metrics import exportar_metricas_json, get_metricas_cache
+from services.dataset_cache import get_status_datasets
+from services.warmup import get_status_aquecimento
+from services.db import get_pool_config, get_pool_status, get_queries_por_pagina
+
+# =========================================================
+# PÁGINA DE MÉTRICAS (ADMIN)
+# =========================================================
+
+def show_pool_section(engine):
+    """Mostra o estado atual do pool de conexões e os tempos de espera."""
+    st.subheader("Pool de Conexões do Banco")
+
+    status = get_pool_status(engine)
+    st.caption(f"Modo: **{status['modo']}**")
+
+    col1, col2, col3, col4 = st.columns(4)
+    if "em_uso" in status:
+        col1.metric("Conexões em uso", f"{status['em_uso']} / {status['pool_size']}")
+        col2.metric("Overflow", f"{status['overflow']} / {status['max_overflow']}")
+    col3.metric("Espera média", f"{status.get('espera_media_ms', 0):.1f} ms")
+    col4.metric("Espera p95", f"{status.get('espera_p95_ms', 0):.1f} ms")
+
+    st.caption(
+        f"Checkouts: {status.get('checkouts', 0)} | "
+        f"Espera máxima: {status.get('espera_max_ms', 0):.1f} ms | "
+        f"Timeouts: {status.get('timeouts', 0)}"
+    )
+
+    with st.expander("Configuração do pool (variáveis de ambiente)"):
+        config = get_pool_config()
+        df_config = pd.DataFrame(
+            [{"Parâmetro": k, "Valor": str(v)} for k, v in config.items()])
+        st.dataframe(df_config, hide_index=True, use_container_width=True)
+
+
+def show_queries_section():
+    """Consultas ao banco e tempo por rerun, agrupados pela página (ou fragmento) exibido."""
+    st.subheader("Consultas e Tempo por Interação")
+    st.caption(
+        "Reruns completos incluem as verificações de inicialização do app; "
+        "linhas com '▸' são reruns de um fragmento da página. "
+        "Cada linha resume as últimas interações."
+    )
+
+    interacoes = get_queries_por_pagina()
+    if not interacoes:
+        st.info("Nenhuma interação registrada ainda neste processo.")
+        return
+
+    linhas = []
+    for pagina, amostras in interacoes.items():
+        contagens = [q for q, _ in amostras]
+        tempos = [s * 1000 for _, s in amostras if s is not None]
+        linhas.append({
+            "Página": pagina,
+            "Reruns": len(amostras),
+            "Consultas (última)": contagens[-1],
+            "Consultas (média)": round(sum(contagens) / len(contagens), 1),
+            "Consultas (máx.)": max(contagens),
+            "Tempo médio (ms)": round(sum(tempos) / len(tempos), 1) if tempos else None,
+            "Tempo máx. (ms)": round(max(tempos), 1) if tempos else None,
+        })
+    st.dataframe(pd.DataFrame(linhas), hide_index=True, use_container_width=True)
+
+
+def show_cache_section():
+    """Hits, misses, tempo de construção e tamanho de cada cache do processo."""
+    st.subheader("Caches de Dados")
+
+    metricas = get_metricas_cache()
+    if not metricas:
+        st.info("Nenhum cache utilizado ainda neste processo.")
+        return
+
+    df_cache = pd.DataFrame(metricas).rename(columns={
+        "cache": "Cache", "chamadas": "Chamadas", "hits": "Hits", "misses": "Misses",
+        "taxa_hit": "Taxa de Hit", "build_medio_ms": "Construção Média (ms)",
+        "build_max_ms": "Construção Máx. (ms)", "ultimo_build_ms": "Última Construção (ms)",
+        "ultimo_mb": "Tamanho Atual (MB)", "max_mb": "Tamanho Máx. (MB)",
+    })
+    st.dataframe(df_cache, hide_index=True, use_container_width=True)
+
+    datasets = get_status_datasets()
+    st.caption(
+        f"Datasets em memória: {datasets['em_uso_mb']} MB de {datasets['orcamento_mb']} MB "
+        f"(DATASET_CACHE_MAX_MB) | Descartes por orçamento: {datasets['descartes']}"
+    )
+    if datasets["entradas"]:
+        st.dataframe(pd.DataFrame(datasets["entradas"]), hide_index=True, use_container_width=True)
+
+    aquecimento = get_status_aquecimento()
+    if aquecimento:
+        st.caption("Aquecimento em segundo plano (na partida e após cada upload):")
+        df_aquec = pd.DataFrame(aquecimento).rename(columns={
+            "tarefa": "Tarefa", "rodando": "Rodando", "execucoes": "Execuções",
+            "ultima_duracao_s": "Última Duração (s)", "concluido_em": "Concluído em", "erro": "Erro",
+        })
+        st.dataframe(df_aquec, hide_index=True, use_container_width=True)
+
+    st.download_button(
+        label="📥 Exportar métricas de cache (JSON)",
+        data=exportar_metricas_json(),
+        file_name="metricas_cache.json",
+        mime="application/json",
+    )
+
+
+def show_metricas_page(engine, base_data_path):
+    st.title("📈 Métricas do Sistema")
+
+    if st.button("🔄 Atualizar Métricas"):
+        st.rerun()
+
+    show_pool_section(engine)
+    st.markdown("---")
+    show_queries_section()
+    st.markdown("---")
+    show_cache_section()
@@ -1,113 +1,103 @@
-import streamlit as st
-# MUDANÇA: Removido sqlite3
-from sqlalchemy import text # MUDANÇA: Adicionado import text
-import pandas as pd
-from datetime import datetime, timedelta
-
-# MUDANÇA: Removido DB_PATH
-# Define o tempo limite de inatividade (em minutos)
-INACTIVITY_LIMIT_MINUTES = 5
-
-# MUDANÇA: Removido @st.cache_data, adicionado 'engine'
-def get_user_status_df(engine):
-    """
-    Busca usuários no DB, calcula o status (com cores) e ordena a lista.
-    """
-    try:
-        # MUDANÇA: Usando 'engine' e 'text()'
-        query = text("SELECT username, ultimo_acesso, status_logado FROM users")
-        df_users = pd.read_sql_query(query, con=engine)
-    except Exception as e:
-        st.error(f"Erro ao carregar usuários: {e}")
-        return pd.DataFrame()
-
-    if df_users.empty:
-        return pd.DataFrame()
-
-    agora = pd.to_datetime(datetime.now())
-    
-    # 1. Converte datas (Postgres já deve retornar datetime, mas 'coerce' é seguro)
-    df_users['ultimo_acesso_dt'] = pd.to_datetime(df_users['ultimo_acesso'], errors='coerce')
-    
-    # 2. Calcula o tempo em segundos
-    # Preenche NaT (datas nulas ou inválidas) com um valor muito alto
-    tempo_total_segundos = (agora - df_users['ultimo_acesso_dt']).dt.total_seconds().fillna(315360000)
-    df_users['Tempo_Segundos'] = tempo_total_segundos
-    
-    # 3. Define Limites de Tempo
-    limite_ativo_seg = INACTIVITY_LIMIT_MINUTES * 60
-    limite_recente_seg = 24 * 60 * 60 # 24 horas
-
-    # 4. Define Cor e Chave de Ordenação
-    df_users['Sort_Key'] = 3
-    df_users['Cor'] = "red"
-    df_users['Status_Desc'] = "Inativo (> 24h)"
-
-    # Inativo Recente (Preto)
-    recente_mask = (df_users['Tempo_Segundos'] < limite_recente_seg)
-    df_users.loc[recente_mask, 'Sort_Key'] = 2
-    df_users.loc[recente_mask, 'Cor'] = "black"
-    df_users.loc[recente_mask, 'Status_Desc'] = "Inativo (< 24h)"
-
-    # Ativo (Verde)
-    ativo_mask = (df_users['status_logado'] == 'LOGADO') & (df_users['Tempo_Segundos'] < limite_ativo_seg)
-    df_users.loc[ativo_mask, 'Sort_Key'] = 1
-    df_users.loc[ativo_mask, 'Cor'] = "green"
-    df_users.loc[ativo_mask, 'Status_Desc'] = f"Ativo (< {INACTIVITY_LIMIT_MINUTES}m)"
-
-    # 5. Formata colunas para exibição
-    df_users['ultimo_acesso_str'] = df_users['ultimo_acesso_dt'].dt.strftime('%Y-%m-%d %H:%M:%S').fillna("Nenhuma Atividade")
-    df_users['Tempo_Formatado'] = df_users['Tempo_Segundos'].apply(
-        lambda x: f"{int(x // 60)}m {int(x % 60)}s" if x < 315360000 else "N/A"
-    )
-
-    # 6. Ordena o DataFrame
-    df_users = df_users.sort_values(by=['Sort_Key', 'Tempo_Segundos'], ascending=[True, True])
-    
-    return df_users
-
-# MUDANÇA: Adicionado 'engine' e 'base_data_path'
-def show_status_page(engine, base_data_path):
-    """Cria a interface da página de status."""
-    st.title("📊 Status dos Usuários Ativos")
-    st.markdown(f"Usuários considerados ativos se acessaram nos últimos **{INACTIVITY_LIMIT_MINUTES} minutos**.")
-
-    if st.button("🔄 Atualizar Status"):
-        # MUDANÇA: Removido 'clear()'
-        st.rerun()
-
-    # MUDANÇA: Passando 'engine'
-    df_status = get_user_status_df(engine)
-    
-    st.markdown("---")
-    
-    # --- NOVO DISPLAY COM CORES ---
-    
-    # Cabeçalho da Tabela
-    col1, col2, col3 = st.columns([1.5, 2, 1.5])
-    col1.markdown("**Usuário**")
-    col2.markdown("**Último Acesso**")
-    col3.markdown("**Status**")
-
-    st.markdown("<hr style='margin-top:0px; margin-bottom:10px;'>", unsafe_allow_html=True)
-
-    if not df_status.empty:
-        # Itera pelas linhas do DataFrame ordenado
-        for index, row in df_status.iterrows():
-            cor = row['Cor']
-            
-            # Define o texto de status
-            if row['Sort_Key'] == 1:
-                status_texto = "Ativo"
-            else:
-                status_texto = row['Tempo_Formatado']
-
-            col1_disp, col2_disp, col3_disp = st.columns([1.5, 2, 1.5])
-            
-            # Aplica a cor usando HTML/Markdown
-            col1_disp.markdown(f"<span style='color: {cor};'>{row['username']}</span>", unsafe_allow_html=True)
-            col2_disp.markdown(f"<span style='color: {cor};'>{row['ultimo_acesso_str']}</span>", unsafe_allow_html=True)
-            col3_disp.markdown(f"<span style='color: {cor};'>**{status_texto}**</span>", unsafe_allow_html=True)
-            
-    else:
-        st.info("Nenhum usuário encontrado no banco de dados.")
+import streamlit as st
+# MUDANÇA: Removido sqlite3
+from sqlalchemy import text # MUDANÇA: Adicionado import text
+import pandas as pd
+from datetime import datetime, timedelta
+
+from page.admin_maint import ROLES_DISPONIVEIS
+
+# MUDANÇA: Removido DB_PATH
+# Define o tempo limite de inatividade (em minutos)
+INACTIVITY_LIMIT_MINUTES = 5
+
+# Usuário sem nenhum acesso registrado conta como "muito tempo atrás"
+SEGUNDOS_SEM_ACESSO = 315360000
+
+# Status, cor, ordenação e tempo formatado saem prontos do SQL; os filtros
+# (só ativos, por função) também são aplicados no banco.
+STATUS_SQL = """
+    WITH base AS (
+        SELECT
+            username,
+            role,
+            ultimo_acesso,
+            COALESCE(EXTRACT(EPOCH FROM (CAST(:agora AS TIMESTAMP) - ultimo_acesso)),
+                     :sem_acesso) AS tempo_segundos,
+            status_logado = 'LOGADO' AS logado
+        FROM users
+        {filtro_role}
+    ), classificado AS (
+        SELECT
+            *,
+            CASE WHEN logado AND tempo_segundos < :limite_ativo THEN 1
+                 WHEN tempo_segundos < :limite_recente THEN 2
+                 ELSE 3 END AS sort_key
+        FROM base
+    )
+    SELECT
+        username,
+        COALESCE(TO_CHAR(ultimo_acesso, 'YYYY-MM-DD HH24:MI:SS'), 'Nenhuma Atividade') AS ultimo_acesso_str,
+        CASE WHEN sort_key = 1 THEN 'Ativo'
+             WHEN tempo_segundos >= :sem_acesso THEN 'N/A'
+             ELSE FLOOR(tempo_segundos / 60) || 'm ' || FLOOR(MOD(CAST(tempo_segundos AS NUMERIC), 60)) || 's'
+        END AS status_texto,
+        CASE sort_key WHEN 1 THEN 'green' WHEN 2 THEN 'black' ELSE 'red' END AS cor,
+        sort_key
+    FROM classificado
+    {filtro_ativos}
+    ORDER BY sort_key, tempo_segundos
+"""
+
+def get_user_status_df(engine, somente_ativos=False, role=None):
+    """
+    Busca os usuários com status, cor e tempo desde o último acesso já
+    calculados no banco, na ordem de exibição (ativos primeiro).
+    """
+    query = text(STATUS_SQL.format(
+        filtro_role="WHERE role = :role" if role else "",
+        filtro_ativos="WHERE sort_key = 1" if somente_ativos else "",
+    ))
+    params = {
+        "agora": datetime.now(),
+        "sem_acesso": SEGUNDOS_SEM_ACESSO,
+        "limite_ativo": INACTIVITY_LIMIT_MINUTES * 60,
+        "limite_recente": 24 * 60 * 60,
+        "role": role,
+    }
+    try:
+        return pd.read_sql_query(query, con=engine, params=params)
+    except Exception as e:
+        st.error(f"Erro ao carregar usuários: {e}")
+        return pd.DataFrame()
+
+def estilizar_status(df_status):
+    """Tabela única de exibição, com a cor do status aplicada em cada linha."""
+    df_exibir = df_status[['username', 'ultimo_acesso_str', 'status_texto']].rename(columns={
+        'username': 'Usuário', 'ultimo_acesso_str': 'Último Acesso', 'status_texto': 'Status'})
+    estilos = 'color: ' + df_status['cor']
+    return df_exibir.style.apply(
+        lambda _: pd.DataFrame({col: estilos for col in df_exibir.columns}), axis=None
+    ).set_properties(subset=['Status'], **{'font-weight': 'bold'})
+
+# MUDANÇA: Adicionado 'engine' e 'base_data_path'
+def show_status_page(engine, base_data_path):
+    """Cria a interface da página de status."""
+    st.title("📊 Status dos Usuários Ativos")
+    st.markdown(f"Usuários considerados ativos se acessaram nos últimos **{INACTIVITY_LIMIT_MINUTES} minutos**.")
+
+    col_btn, col_ativos, col_role = st.columns([1, 1, 1])
+    if col_btn.button("🔄 Atualizar Status"):
+        # MUDANÇA: Removido 'clear()'
+        st.rerun()
+    somente_ativos = col_ativos.toggle("Somente ativos")
+    role = col_role.selectbox("Função:", ["Todas"] + ROLES_DISPONIVEIS)
+
+    df_status = get_user_status_df(engine, somente_ativos, None if role == "Todas" else role)
+    
+    st.markdown("---")
+
+    if not df_status.empty:
+        st.caption(f"{len(df_status)} usuário(s)")
+        st.dataframe(estilizar_status(df_status), hide_index=True, use_container_width=True)
+    else:
+        st.info("Nenhum usuário encontrado no banco de dados.")
@@ -2,71 +2,160 @@ import streamlit as st
 import pandas as pd
 from sqlalchemy import text
 from datetime import datetime, date
+import uuid
+
+from services.bulk_db import copy_dataframe
+from services.ofertas import invalidar_ofertas
+from services.warmup import aquecer_ofertas
 
 # =========================================================
 # FUNÇÕES DE PROCESSAMENTO
 # =========================================================
 
-def processar_upload(engine, df, data_inicio, data_final):
+# Fluxo do upload (tudo em SQL, sem trazer as linhas de volta para o Python):
+#   1. carregar_lote()    -> COPY do arquivo para 'ofertas_staging' (um lote_id)
+#   2. calcular_preview() -> classifica cada linha do lote contra 'ofertas'
+#   3. aplicar_lote()     -> um único INSERT ... ON CONFLICT que também limpa o lote
+
+COLUNAS_STAGING = ['lote_id', 'linha', 'codigo', 'produto', 'oferta', 'data_inicio', 'data_final']
+
+# Uma linha por (codigo, data_inicio, data_final): a última do arquivo prevalece
+# (o INSERT ... SELECT não pode atualizar a mesma linha duas vezes)
+LOTE_SEM_DUPLICADAS_SQL = """
+    SELECT DISTINCT ON (codigo, data_inicio, data_final)
+           codigo, produto, oferta, data_inicio, data_final
+    FROM {origem}
+    WHERE lote_id = :lote_id
+    ORDER BY codigo, data_inicio, data_final, linha DESC
+"""
+
+def preparar_ofertas(df, data_inicio, data_final) -> pd.DataFrame:
     """
-    Processa o DataFrame, valida e faz o "upsert" no banco de dados.
-    'Upsert' = Insere se for novo, Atualiza o preço se (codigo, data_inicio, data_final) já existir.
+    Limpa e valida o DataFrame lido do arquivo (['codigo', 'produto', 'oferta'])
+    e adiciona o período de vigência. Linhas com código inválido são removidas.
+    Levanta ValueError se a data final for anterior à de início.
     """
-    
-    # MUDANÇA: O DataFrame 'df' agora já chega com os nomes corretos
-    # ['codigo', 'produto', 'oferta'] vindos da função de load.
-    # A lógica de mapeamento de colunas foi removida.
-    df_renomeado = df.copy()
-    
-    # 2. Limpeza e Validação dos Dados
-    try:
-        # Codigo: Remove não numéricos, preenche com 0, converte para int
-        df_renomeado['codigo'] = pd.to_numeric(df_renomeado['codigo'], errors='coerce').fillna(0).astype(int)
-        # Oferta: Converte para numérico (float), arredonda para 2 casas
-        df_renomeado['oferta'] = pd.to_numeric(df_renomeado['oferta'], errors='coerce').fillna(0).round(2)
-        # Produto: Converte para string
-        df_renomeado['produto'] = df_renomeado['produto'].astype(str)
-        
-        # Adiciona as datas
-        df_renomeado['data_inicio'] = data_inicio
-        df_renomeado['data_final'] = data_final
-        
-        # Remove linhas onde o código é 0 (inválido)
-        df_renomeado = df_renomeado[df_renomeado['codigo'] != 0]
-        
-    except Exception as e:
-        st.error(f"Erro ao processar os tipos de dados do arquivo: {e}")
-        return False, 0, 0
-        
-    if df_renomeado.empty:
-        st.warning("Nenhum dado válido encontrado no arquivo após a limpeza.")
-        return False, 0, 0
-
-    # 3. Lógica de UPSERT no Banco de Dados (PostgreSQL)
-    upsert_query = text("""
+    if data_final < data_inicio:
+        raise ValueError("A 'Data Final' não pode ser anterior à 'Data de Início'.")
+    df_limpo = df.copy()
+
+    # Codigo: Remove não numéricos, preenche com 0, converte para int
+    df_limpo['codigo'] = pd.to_numeric(df_limpo['codigo'], errors='coerce').fillna(0).astype(int)
+    # Oferta: Converte para numérico (float), arredonda para 2 casas
+    df_limpo['oferta'] = pd.to_numeric(df_limpo['oferta'], errors='coerce').fillna(0).round(2)
+    # Produto: Converte para string
+    df_limpo['produto'] = df_limpo['produto'].astype(str)
+
+    # Adiciona as datas
+    df_limpo['data_inicio'] = data_inicio
+    df_limpo['data_final'] = data_final
+
+    # Posição no arquivo (para 'a última linha prevalece')
+    df_limpo['linha'] = range(len(df_limpo))
+
+    # Remove linhas onde o código é 0 (inválido)
+    return df_limpo[df_limpo['codigo'] != 0]
+
+def carregar_lote(engine, df_limpo) -> str:
+    """Envia as linhas para 'ofertas_staging' (COPY) e retorna o lote_id."""
+    lote_id = uuid.uuid4().hex
+    df_lote = df_limpo.assign(lote_id=lote_id)
+
+    with engine.begin() as conn:
+        # Lotes abandonados (pré-visualizados e nunca confirmados)
+        conn.execute(text("DELETE FROM ofertas_staging WHERE criado_em < now() - INTERVAL '1 day'"))
+        copy_dataframe(conn, df_lote, "ofertas_staging", COLUNAS_STAGING)
+    return lote_id
+
+def calcular_preview(engine, lote_id, limite_detalhe=500):
+    """
+    Compara o lote com a tabela 'ofertas'. Cada linha é:
+      - 'Nova'            : não existe oferta com o mesmo código e período
+      - 'Preço alterado'  : existe, com preço (ou descrição) diferente
+      - 'Sem alteração'   : existe e é igual (será ignorada)
+    e, à parte, marcada como conflito se o mesmo código já tiver outra oferta
+    com período sobreposto. Retorna (resumo, df_detalhe).
+    """
+    query = text(f"""
+        WITH lote AS ({LOTE_SEM_DUPLICADAS_SQL.format(origem="ofertas_staging")}),
+        classificado AS (
+            SELECT
+                l.codigo, l.produto, l.oferta AS oferta_nova, o.oferta AS oferta_atual,
+                l.data_inicio, l.data_final,
+                CASE
+                    WHEN o.id IS NULL THEN 'Nova'
+                    WHEN o.oferta IS DISTINCT FROM l.oferta
+                      OR o.produto IS DISTINCT FROM l.produto THEN 'Preço alterado'
+                    ELSE 'Sem alteração'
+                END AS situacao,
+                EXISTS (
+                    SELECT 1 FROM ofertas c
+                    WHERE c.codigo = l.codigo
+                      AND (c.data_inicio, c.data_final) <> (l.data_inicio, l.data_final)
+                      AND c.data_inicio <= l.data_final
+                      AND c.data_final >= l.data_inicio
+                ) AS conflito
+            FROM lote l
+            LEFT JOIN ofertas o
+              ON o.codigo = l.codigo
+             AND o.data_inicio = l.data_inicio
+             AND o.data_final = l.data_final
+        )
+        SELECT *, COUNT(*) OVER () AS total_linhas,
+               COUNT(*) FILTER (WHERE situacao = 'Nova') OVER () AS total_novas,
+               COUNT(*) FILTER (WHERE situacao = 'Preço alterado') OVER () AS total_alteradas,
+               COUNT(*) FILTER (WHERE situacao = 'Sem alteração') OVER () AS total_iguais,
+               COUNT(*) FILTER (WHERE conflito) OVER () AS total_conflitos
+        FROM classificado
+        ORDER BY conflito DESC, (situacao = 'Sem alteração'), situacao, codigo
+        LIMIT :limite
+    """)
+    with engine.connect() as conn:
+        df = pd.read_sql(query, conn, params={"lote_id": lote_id, "limite": limite_detalhe})
+
+    colunas_total = ['total_linhas', 'total_novas', 'total_alteradas', 'total_iguais', 'total_conflitos']
+    if df.empty:
+        resumo = dict.fromkeys(colunas_total, 0)
+    else:
+        resumo = {col: int(df[col].iloc[0]) for col in colunas_total}
+
+    # Detalhe só do que muda algo ou merece atenção
+    df_detalhe = df[(df['situacao'] != 'Sem alteração') | df['conflito']].drop(columns=colunas_total)
+    return resumo, df_detalhe
+
+def aplicar_lote(engine, lote_id) -> int:
+    """
+    Grava o lote em 'ofertas' com uma única instrução: o CTE remove as linhas
+    do staging e o INSERT ... ON CONFLICT insere as novas e atualiza só as
+    que mudaram. Retorna o número de ofertas inseridas ou atualizadas.
+    """
+    query = text(f"""
+        WITH removidas AS (
+            DELETE FROM ofertas_staging WHERE lote_id = :lote_id
+            RETURNING lote_id, linha, codigo, produto, oferta, data_inicio, data_final
+        )
         INSERT INTO ofertas (codigo, produto, oferta, data_inicio, data_final)
-        VALUES (:codigo, :produto, :oferta, :data_inicio, :data_final)
-        ON CONFLICT (codigo, data_inicio, data_final) 
+        {LOTE_SEM_DUPLICADAS_SQL.format(origem="removidas")}
+        ON CONFLICT (codigo, data_inicio, data_final)
         DO UPDATE SET
             oferta = EXCLUDED.oferta,
             produto = EXCLUDED.produto
-        WHERE 
+        WHERE
             ofertas.oferta IS DISTINCT FROM EXCLUDED.oferta
             OR ofertas.produto IS DISTINCT FROM EXCLUDED.produto
     """)
-    
-    records = df_renomeado.to_dict('records')
-    
-    try:
-        with engine.begin() as conn:
-            result = conn.execute(upsert_query, records)
-            total_afetado = result.rowcount 
-            
-        return True, total_afetado, len(records)
-        
-    except Exception as e:
-        st.error(f"Erro ao salvar dados no banco: {e}")
-        return False, 0, 0
+    with engine.begin() as conn:
+        total_afetado = conn.execute(query, {"lote_id": lote_id}).rowcount
+
+    # Publica a nova versão das ofertas para todas as páginas e já a reconstrói
+    # em segundo plano (o próximo leitor não paga a consulta a frio)
+    invalidar_ofertas()
+    aquecer_ofertas(engine)
+    return total_afetado
+
+def descartar_lote(engine, lote_id):
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM ofertas_staging WHERE lote_id = :lote_id"), {"lote_id": lote_id})
 
 # =========================================================
 # INTERFACE DA PÁGINA
@@ -120,12 +209,82 @@ def show_upload_ofertas_page(engine, base_data_path):
             st.stop()
         # FIM DA MUDANÇA
 
-        if st.button(f"Processar {uploaded_file.name}", type="primary"):
-            with st.spinner("Processando e salvando ofertas..."):
-                success, total_afetado, total_tentado = processar_upload(engine, df, data_inicio, data_final)
-                
-            if success:
-                st.success(f"Upload concluído! {total_afetado} de {total_tentado} registros foram inseridos ou atualizados.")
+        if st.button(f"Pré-visualizar {uploaded_file.name}", type="primary"):
+            try:
+                df_limpo = preparar_ofertas(df, data_inicio, data_final)
+            except ValueError as e:
+                st.error(str(e))
+                st.stop()
+            except Exception as e:
+                st.error(f"Erro ao processar os tipos de dados do arquivo: {e}")
+                st.stop()
+
+            if df_limpo.empty:
+                st.warning("Nenhum dado válido encontrado no arquivo após a limpeza.")
+                st.stop()
+
+            try:
+                with st.spinner("Carregando o arquivo e comparando com as ofertas atuais..."):
+                    lote_id = carregar_lote(engine, df_limpo)
+                    resumo, df_detalhe = calcular_preview(engine, lote_id)
+            except Exception as e:
+                st.error(f"Erro ao carregar o arquivo no banco: {e}")
+                st.stop()
+
+            # Um lote pendente por sessão: o anterior (se houver) é descartado
+            lote_anterior = st.session_state.get("lote_ofertas")
+            if lote_anterior:
+                descartar_lote(engine, lote_anterior["lote_id"])
+            st.session_state.lote_ofertas = {
+                "lote_id": lote_id, "arquivo": uploaded_file.name, "total_tentado": len(df_limpo),
+                "resumo": resumo, "detalhe": df_detalhe,
+            }
+
+    # 3. Pré-visualização e confirmação
+    lote = st.session_state.get("lote_ofertas")
+    if lote:
+        resumo = lote["resumo"]
+        st.subheader(f"3. Confira as Alterações ({lote['arquivo']})")
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Novas", resumo["total_novas"])
+        col2.metric("Preço alterado", resumo["total_alteradas"])
+        col3.metric("Sem alteração", resumo["total_iguais"])
+        col4.metric("Períodos em conflito", resumo["total_conflitos"])
+        st.caption(f"{lote['total_tentado']} linhas válidas no arquivo, "
+                   f"{resumo['total_linhas']} após remover repetidas (a última prevalece).")
+
+        if resumo["total_conflitos"]:
+            st.warning("Há códigos que já têm outra oferta com período sobreposto. "
+                       "Ao confirmar, as duas ofertas passam a coexistir: confira antes.")
+
+        if not lote["detalhe"].empty:
+            st.dataframe(
+                lote["detalhe"],
+                column_config={
+                    "codigo": st.column_config.NumberColumn("Código", format="%d"),
+                    "produto": "Produto",
+                    "oferta_nova": st.column_config.NumberColumn("Nova (R$)", format="%.2f"),
+                    "oferta_atual": st.column_config.NumberColumn("Atual (R$)", format="%.2f"),
+                    "data_inicio": st.column_config.DateColumn("Início", format="DD/MM/YYYY"),
+                    "data_final": st.column_config.DateColumn("Final", format="DD/MM/YYYY"),
+                    "situacao": "Situação",
+                    "conflito": st.column_config.CheckboxColumn("Conflito?"),
+                },
+                hide_index=True,
+                use_container_width=True
+            )
+
+        c1, c2 = st.columns(2)
+        if c1.button("✅ Confirmar e Gravar", type="primary"):
+            try:
+                with st.spinner("Gravando ofertas..."):
+                    total_afetado = aplicar_lote(engine, lote["lote_id"])
+                del st.session_state["lote_ofertas"]
+                st.success(f"Upload concluído! {total_afetado} de {resumo['total_linhas']} registros foram inseridos ou atualizados.")
                 st.info("Registros duplicados (com o mesmo preço) foram ignorados.")
-            else:
-                st.error("Ocorreu um erro durante o processamento.")
+            except Exception as e:
+                st.error(f"Erro ao salvar dados no banco: {e}")
+        if c2.button("Cancelar"):
+            descartar_lote(engine, lote["lote_id"])
+            del st.session_state["lote_ofertas"]
+            st.rerun()
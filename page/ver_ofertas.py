@@ -1,77 +1,132 @@
 import streamlit as st
 import pandas as pd
 from sqlalchemy import text
-from datetime import datetime
+
+from services.bulk_db import montar_unnest
+from services.ofertas import get_ofertas_ativas, invalidar_ofertas
+from services.warmup import aquecer_ofertas
 
 # =========================================================
 # FUNÇÕES DE BANCO DE DADOS
 # =========================================================
 
-@st.cache_data(ttl=300) # Cache de 5 minutos
-def get_ofertas_atuais(_engine):
-    """Busca ofertas onde a data final é hoje ou no futuro."""
-    today = datetime.now().date()
-    query = text("""
-        SELECT 
-            id, 
-            codigo, 
-            produto, 
-            oferta, 
-            data_inicio, 
-            data_final
-        FROM ofertas
-        WHERE data_final >= :today
-        ORDER BY data_inicio ASC
-    """)
-    
-    with _engine.connect() as conn:
-        df = pd.read_sql(query, conn, params={"today": today})
-    return df
+# Colunas editáveis e o tipo SQL de cada uma (para o unnest)
+CAMPOS_EDITAVEIS = {
+    'codigo': 'INTEGER',
+    'produto': 'TEXT',
+    'oferta': 'NUMERIC',
+    'data_inicio': 'DATE',
+    'data_final': 'DATE',
+}
 
-def update_oferta_no_banco(engine, id_oferta, campo, novo_valor):
-    """Atualiza um único campo de uma oferta."""
-    try:
-        with engine.begin() as conn:
-            # Proteção simples contra SQL Injection (garante que 'campo' seja seguro)
-            campos_permitidos = ['oferta', 'produto', 'codigo', 'data_inicio', 'data_final']
-            if campo not in campos_permitidos:
-                st.error(f"Erro: Tentativa de atualizar campo inválido '{campo}'.")
-                return
-            
-            # Formata a data corretamente se for o caso
-            if "data" in campo:
-                novo_valor = pd.to_datetime(novo_valor).date()
-            
-            query = text(f"""
-                UPDATE ofertas
-                SET {campo} = :valor
-                WHERE id = :id_oferta
-            """)
-            conn.execute(query, {"valor": novo_valor, "id_oferta": id_oferta})
-        
-        # Limpa o cache após a edição
-        get_ofertas_atuais.clear()
-        
-    except Exception as e:
-        st.error(f"Erro ao atualizar a oferta: {e}")
+def _periodo_invalido(linha, campos):
+    """Mensagem se as datas (editadas ou as atuais da linha) não formam um período válido."""
+    inicio = campos.get('data_inicio', linha['data_inicio'])
+    final = campos.get('data_final', linha['data_final'])
+    if pd.isna(inicio) or pd.isna(final):
+        return f"Oferta {int(linha['id'])} (código {linha['codigo']}): informe as datas de início e final."
+    if pd.Timestamp(final) < pd.Timestamp(inicio):
+        return (f"Oferta {int(linha['id'])} (código {linha['codigo']}): a data final "
+                f"({pd.Timestamp(final):%d/%m/%Y}) é anterior à de início ({pd.Timestamp(inicio):%d/%m/%Y}).")
+    return None
 
-def deletar_oferta_do_banco(engine, id_oferta):
-    """Deleta uma oferta do banco de dados."""
+def montar_alteracoes_ofertas(df_ofertas, estado_editor):
+    """
+    Converte o change set do st.data_editor (edited_rows, posição -> {coluna: valor})
+    em (edicoes, ids_deletar, erros). 'edicoes' é {id: {campo: valor}} só com as
+    células alteradas; linhas marcadas em 'Deletar' vão só para a deleção.
+    'erros' lista as linhas editadas cujo período fica inválido (nada deve ser gravado).
+    'df_ofertas' tem de ser o DataFrame de onde o editor foi montado.
+    """
+    edicoes, ids_deletar, erros = {}, [], []
+    for posicao, mudancas in estado_editor.get("edited_rows", {}).items():
+        linha = df_ofertas.iloc[int(posicao)]
+        id_oferta = int(linha["id"])
+        if mudancas.get("Deletar"):
+            ids_deletar.append(id_oferta)
+            continue
+
+        campos = {}
+        for campo, valor in mudancas.items():
+            if campo not in CAMPOS_EDITAVEIS:
+                continue
+            # O editor devolve as datas como texto ISO
+            if "data" in campo and valor is not None:
+                valor = pd.to_datetime(valor).date()
+            campos[campo] = valor
+        if campos:
+            edicoes[id_oferta] = campos
+            # Vale também para linhas antigas com período invertido: o CHECK
+            # recusa qualquer UPDATE delas até as datas serem corrigidas
+            erro = _periodo_invalido(linha, campos)
+            if erro:
+                erros.append(erro)
+
+    for posicao in estado_editor.get("deleted_rows", []):
+        ids_deletar.append(int(df_ofertas.iloc[int(posicao)]["id"]))
+    return edicoes, ids_deletar, erros
+
+def salvar_alteracoes_ofertas(engine, edicoes: dict, ids_deletar: list):
+    """
+    Aplica edições e deleções numa única transação: um UPDATE ... FROM unnest
+    (cada campo vem com uma flag dizendo se foi alterado naquela linha) e um
+    DELETE ... = ANY. Retorna (sucesso, mensagem).
+    """
     try:
         with engine.begin() as conn:
-            query = text("DELETE FROM ofertas WHERE id = :id_oferta")
-            conn.execute(query, {"id_oferta": id_oferta})
-        
-        # Limpa o cache após a deleção
-        get_ofertas_atuais.clear()
-        
+            if edicoes:
+                ids = list(edicoes)
+                colunas, tipos, sets_sql, nomes_v = [ids], ["INTEGER"], [], ["id_oferta"]
+                for campo, tipo in CAMPOS_EDITAVEIS.items():
+                    colunas.append([campo in edicoes[i] for i in ids])
+                    tipos.append("BOOLEAN")
+                    colunas.append([edicoes[i].get(campo) for i in ids])
+                    tipos.append(tipo)
+                    nomes_v += [f"set_{campo}", campo]
+                    sets_sql.append(
+                        f"{campo} = CASE WHEN v.set_{campo} THEN v.{campo} ELSE o.{campo} END")
+
+                unnest_sql, params = montar_unnest(colunas, tipos)
+                conn.execute(text(f"""
+                    UPDATE ofertas AS o
+                    SET {", ".join(sets_sql)}
+                    FROM {unnest_sql} AS v({", ".join(nomes_v)})
+                    WHERE o.id = v.id_oferta
+                """), params)
+
+            if ids_deletar:
+                conn.execute(text("DELETE FROM ofertas WHERE id = ANY(CAST(:ids AS INTEGER[]))"),
+                             {"ids": ids_deletar})
+
+        # Publica a nova versão das ofertas (uma vez, depois do COMMIT) e a reaquece
+        invalidar_ofertas()
+        aquecer_ofertas(engine)
+        return True, f"{len(edicoes)} oferta(s) atualizada(s) e {len(ids_deletar)} deletada(s)."
     except Exception as e:
-        st.error(f"Erro ao deletar a oferta: {e}")
+        if "ofertas_periodo_valido" in str(e):
+            return False, "Há ofertas com a data final anterior à de início (nada foi gravado)."
+        return False, f"Erro ao salvar as alterações (nada foi gravado): {e}"
 
 # =========================================================
 # INTERFACE DA PÁGINA
 # =========================================================
 
+# As posições do change set do editor (edited_rows/deleted_rows) só valem para
+# o DataFrame de onde o editor foi montado. As ofertas vêm de um cache
+# compartilhado que outros usuários alteram, então esse DataFrame fica fixo na
+# sessão até gravar ou recarregar (as duas ações trocam a versão do editor).
+def _grade_ofertas(engine) -> pd.DataFrame:
+    versao = st.session_state.versao_editor_ofertas
+    grade = st.session_state.get("grade_ofertas")
+    if grade is None or grade["versao"] != versao:
+        df = get_ofertas_ativas(engine).copy()
+        df["Deletar"] = False
+        grade = st.session_state["grade_ofertas"] = {"versao": versao, "df": df}
+    return grade["df"]
+
+def _recarregar_grade_ofertas():
+    st.session_state.versao_editor_ofertas += 1
+
 def show_ver_ofertas_page(engine, base_data_path):
     st.title("🛒 Ofertas Atuais")
     
@@ -80,9 +135,8 @@ def show_ver_ofertas_page(engine, base_data_path):
     # Define se o usuário pode editar
     pode_editar = (role == 'admin') or (role == 'mkt')
 
-    # MUDANÇA: Passa 'engine' como '_engine' (implícito pelo decorador @st.cache_data)
-    # Na chamada, usamos o objeto engine normal.
-    df_ofertas = get_ofertas_atuais(engine)
+    # Lista vinda do serviço de ofertas (cache único, invalidado nas escritas)
+    df_ofertas = get_ofertas_ativas(engine)
     
     if df_ofertas.empty:
         st.info("Nenhuma oferta ativa encontrada no sistema.")
@@ -90,13 +144,25 @@ def show_ver_ofertas_page(engine, base_data_path):
         
     if pode_editar:
         st.info("Como Admin/Mkt, você pode editar ou deletar ofertas diretamente na tabela abaixo.")
-        st.markdown("Para **deletar**, marque a caixa 'Deletar' e clique fora da tabela.")
+        st.markdown("Edite as células ou marque **'Deletar'** e clique em **'Salvar Alterações'** "
+                    "(tudo é gravado de uma vez).")
 
         # --- Visão de Edição (Admin / Mkt) ---
-        
-        # Adiciona a coluna de deleção
-        df_ofertas["Deletar"] = False
-        
+
+        # A chave muda a cada gravação: o editor recomeça com os dados novos
+        if 'versao_editor_ofertas' not in st.session_state:
+            st.session_state.versao_editor_ofertas = 0
+        chave_editor = f"editor_ofertas_{st.session_state.versao_editor_ofertas}"
+
+        # Grade fixa na sessão (com a coluna de deleção)
+        df_grade = _grade_ofertas(engine)
+        invertidas = df_grade[pd.to_datetime(df_grade['data_final']) < pd.to_datetime(df_grade['data_inicio'])]
+        if not invertidas.empty:
+            st.warning(f"{len(invertidas)} oferta(s) com a data final anterior à de início "
+                       f"(IDs {', '.join(str(i) for i in invertidas['id'])}): corrija as datas ou delete.")
+        st.button("🔄 Recarregar ofertas", on_click=_recarregar_grade_ofertas,
+                  help="Descarta as alterações não salvas e lê as ofertas de novo.")
+
         # Reordena colunas para a edição
         colunas = [
             'Deletar', 'id', 'codigo', 'produto', 'oferta', 
@@ -114,56 +180,31 @@ def show_ver_ofertas_page(engine, base_data_path):
             "Deletar": st.column_config.CheckboxColumn("Deletar?")
         }
 
-        # Salva o estado atual para comparar mudanças
-        if 'df_ofertas_original' not in st.session_state:
-            st.session_state.df_ofertas_original = df_ofertas.copy()
-
-        df_editado = st.data_editor(
-            df_ofertas,
+        st.data_editor(
+            df_grade,
             column_order=colunas,
             column_config=config,
             hide_index=True,
             use_container_width=True,
-            key="editor_ofertas"
+            key=chave_editor
         )
-        
-        # --- Lógica para Salvar Mudanças ---
-        if df_editado is not None:
-            # 1. Processar Deleções
-            ids_para_deletar = df_editado[df_editado["Deletar"] == True]["id"]
-            if not ids_para_deletar.empty:
-                for id_oferta in ids_para_deletar:
-                    deletar_oferta_do_banco(engine, id_oferta)
-                st.session_state.df_ofertas_original = None # Força recarregar
-                st.success(f"{len(ids_para_deletar)} oferta(s) deletada(s).")
-                st.rerun()
 
-            # 2. Processar Edições
-            try:
-                # Compara se houve mudança
-                if not df_editado.equals(st.session_state.df_ofertas_original):
-                    # Encontra linhas diferentes
-                    # (Lógica simplificada: itera e compara)
-                    for index, linha in df_editado.iterrows():
-                        if index not in st.session_state.df_ofertas_original.index:
-                            continue
-                            
-                        linha_original = st.session_state.df_ofertas_original.loc[index]
-                        
-                        # Se marcou deletar, ignora edição
-                        if linha['Deletar']: continue
-
-                        for col in ['codigo', 'produto', 'oferta', 'data_inicio', 'data_final']:
-                            if linha[col] != linha_original[col]:
-                                update_oferta_no_banco(engine, linha['id'], col, linha[col])
-                                st.toast(f"Oferta {linha['codigo']} atualizada!", icon="✅")
-                    
-                    # Atualiza o estado original
-                    st.session_state.df_ofertas_original = df_editado.copy()
-                    # st.rerun() # Opcional: recarregar para confirmar
-
-            except Exception:
-                pass 
+        # --- Lógica para Salvar Mudanças (só o que o editor registrou) ---
+        edicoes, ids_deletar, erros = montar_alteracoes_ofertas(df_grade, st.session_state.get(chave_editor, {}))
+        if edicoes or ids_deletar:
+            st.caption(f"Alterações pendentes: {len(edicoes)} edição(ões), {len(ids_deletar)} deleção(ões).")
+        for erro in erros:
+            st.error(erro)
+
+        if st.button("💾 Salvar Alterações", type="primary",
+                     disabled=not (edicoes or ids_deletar) or bool(erros)):
+            sucesso, mensagem = salvar_alteracoes_ofertas(engine, edicoes, ids_deletar)
+            if sucesso:
+                st.session_state.versao_editor_ofertas += 1
+                st.toast(mensagem, icon="✅")
+                st.rerun()
+            else:
+                st.error(mensagem)
 
     else:
         # --- Visão Somente Leitura (Usuário Padrão) ---
@@ -0,0 +1,60 @@
+import threading
+import time
+
+# =========================================================
+# ESTADO DE INICIALIZAÇÃO (UMA VEZ POR PROCESSO)
+# =========================================================
+# O app.py roda a cada interação (rerun). As verificações de inicialização
+# (schema criado, primeiro acesso) só precisam ir ao banco uma vez por
+# processo; depois são servidas daqui até serem invalidadas explicitamente.
+# Exceção: "primeiro acesso = True" nunca é guardado. O primeiro admin pode
+# ser criado em outra réplica/processo, e um True velho manteria aberta a
+# tela (sem login) de criação do admin; só o False é permanente.
+
+_lock = threading.Lock()
+_estado = {
+    "schema_pronto": False,
+    "primeiro_acesso": None,  # None = ainda não verificado (ou havia zero usuários)
+}
+_ultima_execucao = {}
+
+
+def garantir_schema(criar_tabelas):
+    """Executa 'criar_tabelas' (deve retornar True/False) até a primeira vez que der certo."""
+    if _estado["schema_pronto"]:
+        return
+    with _lock:
+        if not _estado["schema_pronto"]:
+            _estado["schema_pronto"] = bool(criar_tabelas())
+
+
+def is_primeiro_acesso(verificar) -> bool:
+    """
+    Resultado de 'verificar' (True = sem usuários no banco; None = erro na
+    verificação). Só o False fica guardado; enquanto não houver usuários,
+    verifica no banco a cada execução.
+    """
+    if _estado["primeiro_acesso"] is False:
+        return False
+    resultado = verificar()
+    if resultado is False:
+        with _lock:
+            _estado["primeiro_acesso"] = False
+    return bool(resultado)
+
+
+def invalidar_primeiro_acesso():
+    """Volta a verificar no banco na próxima execução (ex: após criar um usuário)."""
+    with _lock:
+        _estado["primeiro_acesso"] = None
+
+
+def executar_periodicamente(nome, intervalo_s, tarefa):
+    """Executa 'tarefa' no máximo uma vez a cada 'intervalo_s' segundos neste processo."""
+    agora = time.monotonic()
+    with _lock:
+        ultima = _ultima_execucao.get(nome)
+        if ultima is not None and agora - ultima < intervalo_s:
+            return
+        _ultima_execucao[nome] = agora
+    tarefa()
@@ -0,0 +1,70 @@
+import io
+from sqlalchemy import text
+
+# =========================================================
+# ESCRITA EM LOTE (COPY -> STAGING -> INSERT ... SELECT)
+# =========================================================
+# O executemany do SQLAlchemy com psycopg2 envia um INSERT por linha.
+# Aqui os dados vão em um único COPY para uma tabela temporária e depois
+# entram na tabela final com um INSERT ... SELECT (uma única instrução).
+
+
+def copy_dataframe(conn, df, tabela, colunas):
+    """Envia as colunas do DataFrame para 'tabela' usando COPY FROM STDIN (CSV)."""
+    buffer = io.StringIO()
+    # Campos vazios (sem aspas) viram NULL no formato CSV do Postgres
+    df[colunas].to_csv(buffer, index=False, header=False, na_rep="")
+    buffer.seek(0)
+
+    cols_sql = ", ".join(colunas)
+    # conn.connection é a conexão DBAPI (psycopg2) da mesma transação
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {tabela} ({cols_sql}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def criar_staging(conn, tabela_destino, tabela_staging, colunas):
+    """Cria uma tabela temporária com os mesmos tipos das colunas do destino."""
+    cols_sql = ", ".join(colunas)
+    conn.execute(text(f"""
+        CREATE TEMP TABLE {tabela_staging} ON COMMIT DROP AS
+        SELECT {cols_sql} FROM {tabela_destino} WITH NO DATA
+    """))
+
+
+def bulk_insert(conn, df, tabela_destino, colunas, on_conflict_sql=""):
+    """
+    Insere o DataFrame em 'tabela_destino' via COPY + INSERT ... SELECT.
+    Deve ser chamado dentro de uma transação (engine.begin()).
+    Retorna o rowcount do INSERT final (linhas inseridas ou atualizadas).
+    """
+    if df.empty:
+        return 0
+
+    tabela_staging = f"stg_{tabela_destino}"
+    criar_staging(conn, tabela_destino, tabela_staging, colunas)
+    copy_dataframe(conn, df, tabela_staging, colunas)
+
+    cols_sql = ", ".join(colunas)
+    result = conn.execute(text(f"""
+        INSERT INTO {tabela_destino} ({cols_sql})
+        SELECT {cols_sql} FROM {tabela_staging}
+        {on_conflict_sql}
+    """))
+    return result.rowcount
+
+
+def montar_unnest(colunas, tipos, prefixo="v"):
+    """
+    Monta um unnest(...) parametrizado para UPDATE ... FROM (conjunto de linhas).
+    'colunas' é uma lista de listas (uma lista de valores por coluna) e
+    'tipos' os tipos SQL de cada coluna. Cada coluna vai como um único array,
+    então o número de parâmetros não cresce com o número de linhas.
+    Retorna (sql_unnest, params).
+    """
+    params = {}
+    arrays_sql = []
+    for j, (valores, tipo) in enumerate(zip(colunas, tipos)):
+        nome = f"{prefixo}_{j}"
+        params[nome] = list(valores)
+        arrays_sql.append(f"CAST(:{nome} AS {tipo}[])")
+    return "unnest(" + ", ".join(arrays_sql) + ")", params
@@ -0,0 +1,87 @@
+import json
+import sys
+import threading
+from datetime import datetime
+
+# =========================================================
+# INSTRUMENTAÇÃO DOS CACHES (HIT/MISS, TEMPO DE CONSTRUÇÃO, TAMANHO)
+# =========================================================
+# Os caches do app (dataset_cache, shared_cache, notificacoes) registram aqui
+# cada chamada como hit ou miss; os misses registram o tempo de construção
+# e o tamanho aproximado do valor.
+# Os números aparecem na página 'Métricas do Sistema' e podem ser exportados
+# em JSON para planejamento de capacidade.
+
+_lock = threading.Lock()
+_metricas = {}
+
+
+def _nova_metrica():
+    return {
+        "chamadas": 0,
+        "misses": 0,
+        "build_total_s": 0.0,
+        "build_max_s": 0.0,
+        "ultimo_build_s": 0.0,
+        "ultimo_bytes": 0,
+        "max_bytes": 0,
+    }
+
+
+def tamanho_aproximado(valor) -> int:
+    """Tamanho aproximado em bytes (DataFrames pelo memory_usage profundo)."""
+    if hasattr(valor, "memory_usage") and hasattr(valor, "columns"):
+        return int(valor.memory_usage(index=True, deep=True).sum())
+    if isinstance(valor, (list, tuple, set)):
+        return sys.getsizeof(valor) + sum(tamanho_aproximado(v) for v in valor)
+    if isinstance(valor, dict):
+        return sys.getsizeof(valor) + sum(
+            tamanho_aproximado(k) + tamanho_aproximado(v) for k, v in valor.items())
+    return sys.getsizeof(valor)
+
+
+def registrar_hit(nome):
+    with _lock:
+        _metricas.setdefault(nome, _nova_metrica())["chamadas"] += 1
+
+
+def registrar_miss(nome, segundos, tamanho_bytes):
+    with _lock:
+        m = _metricas.setdefault(nome, _nova_metrica())
+        m["chamadas"] += 1
+        m["misses"] += 1
+        m["build_total_s"] += segundos
+        m["build_max_s"] = max(m["build_max_s"], segundos)
+        m["ultimo_build_s"] = segundos
+        m["ultimo_bytes"] = tamanho_bytes
+        m["max_bytes"] = max(m["max_bytes"], tamanho_bytes)
+
+
+def get_metricas_cache() -> list:
+    """Resumo por cache, pronto para tabela ou JSON."""
+    with _lock:
+        copia = {nome: dict(m) for nome, m in _metricas.items()}
+
+    resumo = []
+    for nome, m in sorted(copia.items()):
+        hits = m["chamadas"] - m["misses"]
+        resumo.append({
+            "cache": nome,
+            "chamadas": m["chamadas"],
+            "hits": hits,
+            "misses": m["misses"],
+            "taxa_hit": round(hits / m["chamadas"], 3) if m["chamadas"] else 0.0,
+            "build_medio_ms": round(m["build_total_s"] / m["misses"] * 1000, 1) if m["misses"] else 0.0,
+            "build_max_ms": round(m["build_max_s"] * 1000, 1),
+            "ultimo_build_ms": round(m["ultimo_build_s"] * 1000, 1),
+            "ultimo_mb": round(m["ultimo_bytes"] / 1024 ** 2, 2),
+            "max_mb": round(m["max_bytes"] / 1024 ** 2, 2),
+        })
+    return resumo
+
+
+def exportar_metricas_json() -> str:
+    return json.dumps({
+        "gerado_em": datetime.now().isoformat(timespec="seconds"),
+        "caches": get_metricas_cache(),
+    }, ensure_ascii=False, indent=2)
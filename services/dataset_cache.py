@@ -0,0 +1,131 @@
+import functools
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from services.cache_metrics import registrar_hit, registrar_miss, tamanho_aproximado
+
+# =========================================================
+# CACHE DE DATASETS (LRU POR BYTES, UMA VERSÃO POR ARQUIVO)
+# =========================================================
+# Os arquivos de dados (Mix, Histórico, WMS) são grandes e mudam a cada
+# upload. O @st.cache_data guardava uma entrada por mod_time e as versões
+# antigas ficavam na memória até o processo reiniciar. Aqui cada arquivo tem
+# no máximo UMA versão residente: a nova substitui a anterior na hora, e o
+# conjunto todo respeita um orçamento de memória (DATASET_CACHE_MAX_MB),
+# descartando primeiro os datasets usados há mais tempo.
+#
+# Os DataFrames devolvidos são compartilhados entre as sessões: quem precisar
+# alterar deve trabalhar numa cópia (.copy()) ou num recorte novo.
+
+try:
+    ORCAMENTO_BYTES = int(float(os.getenv("DATASET_CACHE_MAX_MB", "1024")) * 1024 ** 2)
+except ValueError:
+    ORCAMENTO_BYTES = 1024 * 1024 ** 2
+
+_lock = threading.Lock()
+_entradas = OrderedDict()  # (nome, caminho) -> (versao, valor, bytes)
+_construcao_locks = {}  # (nome, caminho) -> Lock (uma construção por arquivo)
+_estado = {"bytes": 0, "descartes": 0}
+
+
+def versao_arquivo(base_path_no_ext, ext):
+    """mod_time do Parquet (preferido) ou do arquivo original; 0.0 se não existir."""
+    for caminho in (f"{base_path_no_ext}.parquet", f"{base_path_no_ext}.{ext}"):
+        try:
+            return os.path.getmtime(caminho)
+        except OSError:
+            continue
+    return 0.0
+
+
+def _remover(chave):
+    _, _, tamanho = _entradas.pop(chave)
+    _estado["bytes"] -= tamanho
+
+
+def _guardar(chave, versao, valor, tamanho):
+    """Publica a nova versão (descartando a anterior) e aplica o orçamento."""
+    with _lock:
+        if chave in _entradas:
+            _remover(chave)
+        _entradas[chave] = (versao, valor, tamanho)
+        _estado["bytes"] += tamanho
+
+        # LRU: a entrada recém-publicada fica por último e nunca é descartada
+        while _estado["bytes"] > ORCAMENTO_BYTES and len(_entradas) > 1:
+            _remover(next(iter(_entradas)))
+            _estado["descartes"] += 1
+
+
+def _buscar(chave, versao):
+    with _lock:
+        entrada = _entradas.get(chave)
+        if entrada is None or entrada[0] != versao:
+            return None
+        _entradas.move_to_end(chave)
+        return entrada[1]
+
+
+def _vazio(valor):
+    return valor is None or getattr(valor, "empty", False)
+
+
+def dataset_cache(nome):
+    """
+    Decorador para loaders no formato func(base_path_no_ext, mod_time).
+    Guarda uma versão por arquivo; um mod_time novo substitui a anterior.
+    Resultados vazios (falha de leitura) não são guardados.
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def carregar(base_path_no_ext, mod_time):
+            chave = (nome, base_path_no_ext)
+            valor = _buscar(chave, mod_time)
+            if valor is not None:
+                registrar_hit(nome)
+                return valor
+
+            with _lock:
+                construcao = _construcao_locks.setdefault(chave, threading.Lock())
+            # Sessões simultâneas esperam a mesma leitura em vez de repeti-la
+            with construcao:
+                valor = _buscar(chave, mod_time)
+                if valor is not None:
+                    registrar_hit(nome)
+                    return valor
+
+                inicio = time.perf_counter()
+                valor = func(base_path_no_ext, mod_time)
+                if _vazio(valor):
+                    return valor
+                tamanho = tamanho_aproximado(valor)
+                registrar_miss(nome, time.perf_counter() - inicio, tamanho)
+                _guardar(chave, mod_time, valor, tamanho)
+                return valor
+
+        return carregar
+    return decorador
+
+
+def invalidar_datasets(base_path_no_ext=None):
+    """Descarta as versões em memória de um arquivo (ou de todos)."""
+    with _lock:
+        for chave in list(_entradas):
+            if base_path_no_ext is None or chave[1] == base_path_no_ext:
+                _remover(chave)
+
+
+def get_status_datasets() -> dict:
+    with _lock:
+        return {
+            "orcamento_mb": round(ORCAMENTO_BYTES / 1024 ** 2, 1),
+            "em_uso_mb": round(_estado["bytes"] / 1024 ** 2, 2),
+            "descartes": _estado["descartes"],
+            "entradas": [
+                {"dataset": nome, "arquivo": os.path.basename(caminho),
+                 "mb": round(tamanho / 1024 ** 2, 2)}
+                for (nome, caminho), (_, _, tamanho) in _entradas.items()
+            ],
+        }
@@ -0,0 +1,226 @@
+import functools
+import os
+import threading
+import time
+from collections import deque
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import NullPool, QueuePool
+
+# =========================================================
+# CONFIGURAÇÃO DO POOL DE CONEXÕES (VIA VARIÁVEIS DE AMBIENTE)
+# =========================================================
+# DB_POOL_SIZE        conexões mantidas abertas no pool (padrão 10)
+# DB_MAX_OVERFLOW     conexões extras em pico (padrão 5)
+# DB_POOL_TIMEOUT     segundos esperando uma conexão livre (padrão 30)
+# DB_POOL_RECYCLE     recicla conexões mais velhas que N segundos (padrão 1800)
+# DB_POOL_PRE_PING    testa a conexão antes de usar (padrão 1, evita erro pós-failover)
+# DB_PGBOUNCER        1 = modo PgBouncer (NullPool: o PgBouncer faz o pooling)
+# DB_SSLMODE          sslmode do psycopg2 (padrão 'require')
+
+
+def _env_int(nome, padrao):
+    try:
+        return int(os.getenv(nome, padrao))
+    except (TypeError, ValueError):
+        return padrao
+
+
+def _env_bool(nome, padrao):
+    valor = os.getenv(nome)
+    if valor is None:
+        return padrao
+    return valor.strip().lower() in ("1", "true", "sim", "yes", "on")
+
+
+def get_pool_config() -> dict:
+    return {
+        "pgbouncer": _env_bool("DB_PGBOUNCER", False),
+        "pool_size": _env_int("DB_POOL_SIZE", 10),
+        "max_overflow": _env_int("DB_MAX_OVERFLOW", 5),
+        "pool_timeout": _env_int("DB_POOL_TIMEOUT", 30),
+        "pool_recycle": _env_int("DB_POOL_RECYCLE", 1800),
+        "pool_pre_ping": _env_bool("DB_POOL_PRE_PING", True),
+        "sslmode": os.getenv("DB_SSLMODE", "require"),
+    }
+
+
+# =========================================================
+# MÉTRICAS DO POOL
+# =========================================================
+class MetricasPool:
+    """Tempo de espera por conexão (checkout) e timeouts do pool."""
+
+    def __init__(self, amostras=1000):
+        self._lock = threading.Lock()
+        self._esperas = deque(maxlen=amostras)
+        self.total_checkouts = 0
+        self.total_timeouts = 0
+        self.espera_total_s = 0.0
+        self.espera_max_s = 0.0
+
+    def registrar_espera(self, segundos, timeout=False):
+        with self._lock:
+            self.total_checkouts += 1
+            self.espera_total_s += segundos
+            self.espera_max_s = max(self.espera_max_s, segundos)
+            self._esperas.append(segundos)
+            if timeout:
+                self.total_timeouts += 1
+
+    def resumo(self) -> dict:
+        with self._lock:
+            esperas = sorted(self._esperas)
+            n = len(esperas)
+            return {
+                "checkouts": self.total_checkouts,
+                "timeouts": self.total_timeouts,
+                "espera_media_ms": (self.espera_total_s / self.total_checkouts * 1000) if self.total_checkouts else 0.0,
+                "espera_p95_ms": (esperas[int(n * 0.95) - 1 if n > 1 else 0] * 1000) if n else 0.0,
+                "espera_max_ms": self.espera_max_s * 1000,
+            }
+
+
+class _EsperaMedidaMixin:
+    """Mede quanto tempo cada checkout esperou por uma conexão."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metricas = MetricasPool()
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conn = super()._do_get()
+        except PoolTimeoutError:
+            self.metricas.registrar_espera(time.perf_counter() - inicio, timeout=True)
+            raise
+        self.metricas.registrar_espera(time.perf_counter() - inicio)
+        return conn
+
+
+class QueuePoolMedido(_EsperaMedidaMixin, QueuePool):
+    pass
+
+
+class NullPoolMedido(_EsperaMedidaMixin, NullPool):
+    pass
+
+
+# =========================================================
+# CONTADOR DE CONSULTAS E LATÊNCIA POR RERUN
+# =========================================================
+# Cada rerun do Streamlit roda inteiro em uma thread, então um contador
+# por thread mede quantas consultas uma interação realmente faz. Reruns de
+# fragmento (@st.fragment) não passam pelo app.py: são medidos pelo
+# decorador medir_interacao().
+_contador_local = threading.local()
+_interacoes_por_pagina = {}
+_queries_lock = threading.Lock()
+
+
+def _contar_query(conn, cursor, statement, parameters, context, executemany):
+    _contador_local.total = getattr(_contador_local, "total", 0) + 1
+
+
+def iniciar_contagem_queries():
+    _contador_local.total = 0
+    _contador_local.inicio = time.perf_counter()
+
+
+def get_contagem_queries() -> int:
+    return getattr(_contador_local, "total", 0)
+
+
+def get_tempo_rerun() -> float:
+    """Segundos desde iniciar_contagem_queries() nesta thread."""
+    return time.perf_counter() - getattr(_contador_local, "inicio", time.perf_counter())
+
+
+def registrar_queries_pagina(pagina, total, segundos=None, amostras=50):
+    """Guarda as últimas interações por página: consultas feitas e tempo do rerun."""
+    with _queries_lock:
+        historico = _interacoes_por_pagina.setdefault(pagina, deque(maxlen=amostras))
+        historico.append((total, segundos))
+
+
+def get_queries_por_pagina() -> dict:
+    """{página: [(consultas, segundos ou None), ...]} das últimas interações."""
+    with _queries_lock:
+        return {pagina: list(hist) for pagina, hist in _interacoes_por_pagina.items()}
+
+
+def medir_interacao(nome):
+    """
+    Decorador para trechos que rodam sozinhos (ex: fragmentos): registra as
+    consultas e o tempo de cada execução sob 'nome'. Usa a diferença do
+    contador, então também funciona dentro de um rerun completo.
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def medido(*args, **kwargs):
+            antes = get_contagem_queries()
+            inicio = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                registrar_queries_pagina(nome, get_contagem_queries() - antes,
+                                         time.perf_counter() - inicio)
+        return medido
+    return decorador
+
+
+# =========================================================
+# CRIAÇÃO DO ENGINE
+# =========================================================
+def criar_engine(db_url: str, config: dict = None):
+    """
+    Cria o engine do SQLAlchemy com as configurações de pool do ambiente.
+    No modo PgBouncer (pool em modo transação) não há pool local e nada depende
+    de estado de sessão no servidor: o psycopg2 não usa prepared statements do
+    lado do servidor, então não há nada a desligar no driver.
+    """
+    config = config or get_pool_config()
+
+    if db_url.startswith("postgres://"):
+        db_url = db_url.replace("postgres://", "postgresql://", 1)
+
+    connect_args = {"sslmode": config["sslmode"]} if config["sslmode"] else {}
+
+    if config["pgbouncer"]:
+        engine = create_engine(db_url, connect_args=connect_args, poolclass=NullPoolMedido)
+    else:
+        engine = create_engine(
+            db_url,
+            connect_args=connect_args,
+            poolclass=QueuePoolMedido,
+            pool_size=config["pool_size"],
+            max_overflow=config["max_overflow"],
+            pool_timeout=config["pool_timeout"],
+            pool_recycle=config["pool_recycle"],
+            pool_pre_ping=config["pool_pre_ping"],
+        )
+
+    event.listen(engine, "before_cursor_execute", _contar_query)
+    return engine
+
+
+def get_pool_status(engine) -> dict:
+    """Fotografia do pool: conexões em uso, overflow e tempos de espera."""
+    pool = engine.pool
+    status = {"modo": "PgBouncer (NullPool)" if isinstance(pool, NullPool) else "QueuePool"}
+
+    if isinstance(pool, QueuePool):
+        status.update({
+            "pool_size": pool.size(),
+            "em_uso": pool.checkedout(),
+            "livres": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+        })
+
+    metricas = getattr(pool, "metricas", None)
+    if metricas is not None:
+        status.update(metricas.resumo())
+    return status
@@ -0,0 +1,101 @@
+import io
+import itertools
+
+import numpy as np
+import pandas as pd
+import xlsxwriter
+
+# =========================================================
+# EXPORTAÇÃO XLSX EM MEMÓRIA CONSTANTE
+# =========================================================
+# O pd.ExcelWriter monta a planilha inteira em memória (um objeto por célula)
+# antes de gravar, e medir cada coluna com astype(str).map(len) passa por
+# todas as células em Python. Aqui o xlsxwriter roda em modo 'constant_memory'
+# (cada linha vai para um arquivo temporário assim que a próxima começa), as
+# linhas são escritas em blocos e a largura das colunas é estimada: pelo maior
+# valor nas colunas numéricas e por uma amostra nas de texto.
+
+TAMANHO_BLOCO = 10_000
+AMOSTRA_LARGURA = 5_000
+LARGURA_MAXIMA = 60
+LARGURA_INF = 4  # "-inf": coluna numérica sem nenhum valor finito
+
+
+def estimar_larguras(df: pd.DataFrame, amostra=AMOSTRA_LARGURA) -> list:
+    """Largura (em caracteres) de cada coluna, sem percorrer todas as células de texto."""
+    passo = max(len(df) // amostra, 1)
+    larguras = []
+    for col in df.columns:
+        serie = df[col]
+        if serie.dropna().empty:
+            comprimento = 0
+        elif pd.api.types.is_bool_dtype(serie):
+            comprimento = 5
+        elif pd.api.types.is_numeric_dtype(serie):
+            valores = serie.to_numpy(dtype=float, na_value=np.nan)
+            valores = valores[np.isfinite(valores)]
+            if valores.size == 0:
+                comprimento = LARGURA_INF
+            else:
+                comprimento = len(str(int(np.abs(valores).max())))
+                comprimento += int(valores.min() < 0)
+                if pd.api.types.is_float_dtype(serie):
+                    comprimento += 3
+        elif pd.api.types.is_datetime64_any_dtype(serie):
+            comprimento = 16
+        else:
+            comprimento = int(serie.iloc[::passo].astype(str).str.len().max())
+        larguras.append(min(max(comprimento, len(str(col))) + 2, LARGURA_MAXIMA))
+    return larguras
+
+
+def _linhas(bloco: pd.DataFrame):
+    # object + None nos nulos: números/textos vão direto e as células vazias são puladas;
+    # ±inf vira texto, como o inf_rep do to_excel (o xlsxwriter não grava inf como número)
+    objetos = bloco.astype(object).where(bloco.notna(), None)
+    numeros = bloco.select_dtypes('float')
+    infinitos = np.isinf(numeros.to_numpy())
+    if infinitos.any():
+        sinais = np.where(numeros.to_numpy() > 0, 'inf', '-inf')
+        objetos[numeros.columns] = objetos[numeros.columns].mask(infinitos, sinais)
+    return objetos.itertuples(index=False, name=None)
+
+
+def escrever_xlsx(dados, nome_aba, tamanho_bloco=TAMANHO_BLOCO, congelar=None) -> bytes:
+    """
+    Gera o XLSX de 'dados': um DataFrame (escrito em fatias de 'tamanho_bloco'
+    linhas) ou um iterável de DataFrames (ex: read_sql com chunksize), caso em
+    que as larguras vêm do primeiro bloco. 'congelar' = (linha, coluna) do
+    freeze_panes.
+    """
+    if isinstance(dados, pd.DataFrame):
+        referencia = dados
+        blocos = (dados.iloc[i:i + tamanho_bloco] for i in range(0, len(dados), tamanho_bloco))
+    else:
+        blocos = iter(dados)
+        referencia = next(blocos, pd.DataFrame())
+        blocos = itertools.chain([referencia], blocos)
+
+    output = io.BytesIO()
+    workbook = xlsxwriter.Workbook(output, {
+        'constant_memory': True,
+        'default_date_format': 'dd/mm/yyyy hh:mm',
+        'remove_timezone': True,
+    })
+    worksheet = workbook.add_worksheet(nome_aba)
+    cabecalho = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+
+    for idx, largura in enumerate(estimar_larguras(referencia)):
+        worksheet.set_column(idx, idx, largura)
+    if congelar:
+        worksheet.freeze_panes(*congelar)
+
+    worksheet.write_row(0, 0, [str(col) for col in referencia.columns], cabecalho)
+    linha = 1
+    for bloco in blocos:
+        for valores in _linhas(bloco):
+            worksheet.write_row(linha, 0, valores)
+            linha += 1
+
+    workbook.close()
+    return output.getvalue()
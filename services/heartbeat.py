@@ -0,0 +1,86 @@
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+from services.bulk_db import montar_unnest
+
+# =========================================================
+# HEARTBEAT DE ATIVIDADE (ultimo_acesso) COM ESCRITA AGRUPADA
+# =========================================================
+# Cada rerun de um usuário logado só anota o horário em memória.
+# Uma thread do processo grava o último horário de todas as sessões a cada
+# HEARTBEAT_INTERVAL_SECONDS, em um único UPDATE.
+
+HEARTBEAT_INTERVALO_S = int(os.getenv("HEARTBEAT_INTERVAL_SECONDS", "30"))
+
+_lock = threading.Lock()
+_buffer = {}  # username -> último horário de atividade
+_thread = None
+
+
+def registrar_atividade(username):
+    """Anota a atividade do usuário em memória (sem ir ao banco)."""
+    if not username:
+        return
+    with _lock:
+        _buffer[username.lower()] = datetime.now()
+
+
+def descartar_atividade(username):
+    """Remove atividade pendente (ex: no logout, que já grava o status direto)."""
+    with _lock:
+        _buffer.pop((username or "").lower(), None)
+
+
+def flush_atividades(engine) -> int:
+    """Grava todas as atividades pendentes em um único UPDATE. Retorna quantos usuários."""
+    with _lock:
+        if not _buffer:
+            return 0
+        pendentes = dict(_buffer)
+        _buffer.clear()
+
+    usernames = list(pendentes.keys())
+    horarios = [pendentes[u] for u in usernames]
+    unnest_sql, params = montar_unnest([usernames, horarios], ["TEXT", "TIMESTAMP"])
+
+    query = text(f"""
+        UPDATE users AS u
+        SET ultimo_acesso = v.ultimo_acesso
+        FROM {unnest_sql} AS v(username, ultimo_acesso)
+        WHERE u.username = v.username
+          AND (u.ultimo_acesso IS NULL OR u.ultimo_acesso < v.ultimo_acesso)
+    """)
+    try:
+        with engine.begin() as conn:
+            conn.execute(query, params)
+    except Exception as e:
+        # Devolve ao buffer (sem sobrescrever atividade mais nova) para a próxima rodada
+        with _lock:
+            for username, horario in pendentes.items():
+                if _buffer.get(username, horario) <= horario:
+                    _buffer[username] = horario
+        print(f"Erro ao gravar heartbeat de usuários: {e}")
+        return 0
+    return len(usernames)
+
+
+def _loop_heartbeat(engine):
+    while True:
+        time.sleep(HEARTBEAT_INTERVALO_S)
+        flush_atividades(engine)
+
+
+def iniciar_heartbeat(engine):
+    """Inicia (uma vez por processo) a thread que grava o heartbeat periodicamente."""
+    global _thread
+    if _thread is not None:
+        return
+    with _lock:
+        if _thread is None:
+            _thread = threading.Thread(
+                target=_loop_heartbeat, args=(engine,), name="heartbeat-usuarios", daemon=True)
+            _thread.start()
@@ -0,0 +1,183 @@
+import os
+import select
+import threading
+import time
+
+from sqlalchemy import text
+
+from services.cache_metrics import registrar_hit, registrar_miss, tamanho_aproximado
+from services.db import get_pool_config
+from services.shared_cache import invalidar, obter
+
+# =========================================================
+# CONTAGEM DE CHAMADOS NÃO LIDOS (LISTEN/NOTIFY)
+# =========================================================
+# As escritas do Contato emitem NOTIFY no canal 'contato_chamados' (payload =
+# dono do chamado, ou '*' para "recarregar tudo"). Uma thread por processo
+# escuta o canal e mantém em memória a contagem de chamados por usuário e
+# status; o badge do menu lateral é servido daqui, sem consulta por sessão.
+#
+# Sem listener (ex: PgBouncer em modo transação, onde LISTEN não funciona),
+# o mesmo mapa é recarregado por um único GROUP BY a cada
+# CONTAGEM_INTERVALO_S, compartilhado por todas as sessões do processo e,
+# via cache compartilhado, por todas as réplicas (uma consulta por versão).
+
+CANAL = "contato_chamados"
+RECARREGAR_TUDO = "*"
+CONTAGEM_INTERVALO_S = int(os.getenv("CONTAGEM_INTERVAL_SECONDS", "60"))
+NAMESPACE_CONTAGENS = "snapshot_chamados"
+
+_lock = threading.Lock()
+_recarga_lock = threading.Lock()
+_contagens = {}  # usuario_username -> {status: quantidade}
+_estado = {"ativo": False, "thread": None, "ultima_carga": None}
+
+
+def notificar_contato(conn, username=RECARREGAR_TUDO):
+    """Emite o NOTIFY dentro da transação da escrita (entregue no COMMIT)."""
+    conn.execute(text("SELECT pg_notify(:canal, :payload)"),
+                 {"canal": CANAL, "payload": username or RECARREGAR_TUDO})
+
+
+def invalidar_contagens():
+    """Descarta a contagem compartilhada entre réplicas. Chamar após o COMMIT."""
+    invalidar(NAMESPACE_CONTAGENS)
+
+
+def _consultar_contagens(conn, username=None):
+    query = """
+        SELECT usuario_username, status, COUNT(id)
+        FROM contato_chamados
+    """
+    params = {}
+    if username is not None:
+        query += " WHERE usuario_username = :username"
+        params["username"] = username
+    query += " GROUP BY usuario_username, status"
+
+    contagens = {}
+    for usuario, status, qtd in conn.execute(text(query), params):
+        contagens.setdefault(usuario, {})[status] = qtd
+    return contagens
+
+
+def _consultar_todas(engine):
+    with engine.connect() as conn:
+        return _consultar_contagens(conn)
+
+
+def recarregar_contagens(engine, username=None, usar_cache=False):
+    """
+    Recarrega as contagens de um usuário (ou de todos) a partir do banco.
+    Com 'usar_cache', a carga completa vem do cache compartilhado quando outra
+    réplica já consultou a versão atual. O listener nunca usa o cache: o
+    NOTIFY chega no COMMIT, antes de quem escreveu invalidar a versão.
+    """
+    inicio = time.perf_counter()
+    if username is None and usar_cache:
+        novas = obter(NAMESPACE_CONTAGENS, "todos", lambda: _consultar_todas(engine),
+                      ttl_s=CONTAGEM_INTERVALO_S)
+    else:
+        with engine.connect() as conn:
+            novas = _consultar_contagens(conn, username)
+    with _lock:
+        if username is None:
+            _contagens.clear()
+            _estado["ultima_carga"] = time.monotonic()
+        else:
+            _contagens.pop(username, None)
+        _contagens.update(novas)
+        tamanho = tamanho_aproximado(_contagens)
+    # Recarga completa = miss do mapa; as parciais (NOTIFY) só atualizam uma entrada
+    if username is None:
+        registrar_miss("contagem_chamados", time.perf_counter() - inicio, tamanho)
+
+
+def atualizar_contagens_se_expirado(engine, intervalo_s=CONTAGEM_INTERVALO_S):
+    """
+    Recarrega o mapa inteiro (um único GROUP BY) se a última carga tiver mais
+    de 'intervalo_s'. Só uma sessão por vez recarrega; as demais seguem com
+    os valores atuais em vez de esperar ou repetir a consulta.
+    """
+    ultima = _estado["ultima_carga"]
+    if ultima is not None and time.monotonic() - ultima < intervalo_s:
+        return
+    if not _recarga_lock.acquire(blocking=False):
+        return
+    try:
+        ultima = _estado["ultima_carga"]
+        if ultima is None or time.monotonic() - ultima >= intervalo_s:
+            recarregar_contagens(engine, usar_cache=True)
+    except Exception as e:
+        # Se as tabelas ainda não existem, não falha
+        if "does not exist" not in str(e):
+            print(f"Erro ao buscar contagem de mensagens: {e}")
+    finally:
+        _recarga_lock.release()
+
+
+def get_unread_count(username, role) -> int:
+    """Admin vê tickets 'Aguardando Retorno'; usuário vê os seus 'Respondidos'."""
+    registrar_hit("contagem_chamados")
+    with _lock:
+        if role == "admin":
+            return sum(s.get("Aguardando Retorno", 0) for s in _contagens.values())
+        return _contagens.get(username, {}).get("Respondido", 0)
+
+
+def listener_ativo() -> bool:
+    return _estado["ativo"]
+
+
+def _escutar(engine):
+    while True:
+        raw = None
+        try:
+            # Conexão dedicada, fora do pool (fica presa no LISTEN)
+            raw = engine.raw_connection()
+            dbapi_conn = raw.driver_connection
+            raw.detach()
+            dbapi_conn.autocommit = True
+            with dbapi_conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {CANAL}")
+
+            # Carga inicial depois do LISTEN, para não perder escritas no meio
+            recarregar_contagens(engine)
+            _estado["ativo"] = True
+
+            while True:
+                if select.select([dbapi_conn], [], [], 1.0) == ([], [], []):
+                    continue
+                dbapi_conn.poll()
+                usuarios = {n.payload for n in dbapi_conn.notifies}
+                dbapi_conn.notifies.clear()
+
+                if RECARREGAR_TUDO in usuarios:
+                    recarregar_contagens(engine)
+                else:
+                    for usuario in usuarios:
+                        recarregar_contagens(engine, usuario)
+        except Exception as e:
+            _estado["ativo"] = False
+            print(f"Listener de chamados desconectado, tentando novamente: {e}")
+            time.sleep(5)
+        finally:
+            if raw is not None:
+                try:
+                    raw.close()
+                except Exception:
+                    pass
+
+
+def iniciar_listener(engine):
+    """
+    Inicia (uma vez por processo) a thread que escuta o canal de chamados.
+    No modo PgBouncer o LISTEN não recebe nada, então fica só a recarga por intervalo.
+    """
+    if _estado["thread"] is not None or get_pool_config()["pgbouncer"]:
+        return
+    with _lock:
+        if _estado["thread"] is None:
+            _estado["thread"] = threading.Thread(
+                target=_escutar, args=(engine,), name="listener-chamados", daemon=True)
+            _estado["thread"].start()
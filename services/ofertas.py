@@ -0,0 +1,107 @@
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import text
+
+from services.shared_cache import invalidar, obter
+
+# =========================================================
+# SERVIÇO DE OFERTAS ATIVAS (CACHE ÚNICO PARA TODAS AS PÁGINAS)
+# =========================================================
+# Todas as páginas leem as ofertas ativas/futuras daqui (a lista completa e a
+# oferta aplicável por código). Os resultados ficam no cache compartilhado
+# entre réplicas (namespace 'ofertas'): cada escrita confirmada (upload,
+# edição, deleção) chama invalidar_ofertas(), que incrementa a versão do
+# namespace em todas as réplicas de uma vez.
+
+COLUNAS_OFERTAS = ['id', 'codigo', 'produto', 'oferta', 'data_inicio', 'data_final']
+NAMESPACE = "ofertas"
+
+# O TTL só limpa versões esquecidas; a invalidação é pela versão
+TTL_OFERTAS_S = 300
+
+
+def invalidar_ofertas():
+    """Chamar após o COMMIT de qualquer escrita na tabela 'ofertas'."""
+    invalidar(NAMESPACE)
+
+
+# Regra única de "qual oferta vale para o código na data D" (usada aqui e no
+# LEFT JOIN LATERAL da aprovação): entre as ofertas cuja vigência contém D,
+# a de início mais recente; com 'incluir_futuras', se nenhuma estiver
+# vigente, a próxima a começar. Empates: a última inserida.
+# O filtro por (codigo, vigencia) usa o índice GiST idx_ofertas_codigo_vigencia.
+def sql_oferta_aplicavel(expr_codigo, incluir_futuras=True):
+    """Subconsulta (para LATERAL) com a oferta aplicável a 'expr_codigo' em :data_oferta."""
+    filtro_vigencia = (
+        "vigencia && daterange(CAST(:data_oferta AS DATE), NULL)"
+        if incluir_futuras else
+        "vigencia @> CAST(:data_oferta AS DATE)"
+    )
+    return f"""
+        SELECT id, produto, oferta, data_inicio, data_final
+        FROM ofertas
+        WHERE codigo = {expr_codigo}
+          AND {filtro_vigencia}
+        ORDER BY (data_inicio <= CAST(:data_oferta AS DATE)) DESC,
+                 CASE WHEN data_inicio <= CAST(:data_oferta AS DATE) THEN data_inicio END DESC,
+                 data_inicio ASC,
+                 id DESC
+        LIMIT 1
+    """
+
+
+def _consultar_ofertas_aplicaveis(engine, hoje: date):
+    """Oferta aplicável hoje (vigente ou a próxima) de cada código com oferta ativa/futura."""
+    query = text(f"""
+        SELECT o.id, c.codigo, o.produto, o.oferta, o.data_inicio, o.data_final
+        FROM (
+            SELECT DISTINCT codigo FROM ofertas
+            WHERE vigencia && daterange(CAST(:data_oferta AS DATE), NULL)
+        ) AS c
+        CROSS JOIN LATERAL ({sql_oferta_aplicavel("c.codigo")}) o
+    """)
+    with engine.connect() as conn:
+        df = pd.read_sql(query, conn, params={"data_oferta": hoje})
+    return df.set_index('codigo')
+
+
+def get_ofertas_aplicaveis(engine) -> pd.DataFrame:
+    """
+    Oferta aplicável hoje a cada código (a regra de sql_oferta_aplicavel, com
+    futuras), indexada por 'codigo'; códigos sem oferta não aparecem. Uma
+    consulta para todos os códigos, no cache compartilhado do namespace.
+    """
+    try:
+        hoje = date.today()
+        return obter(NAMESPACE, f"aplicaveis:{hoje.isoformat()}",
+                     lambda: _consultar_ofertas_aplicaveis(engine, hoje), TTL_OFERTAS_S)
+    except Exception:
+        return pd.DataFrame(columns=COLUNAS_OFERTAS).set_index('codigo')
+
+
+def _consultar_ofertas(engine, hoje: date):
+    """
+    Lê as ofertas vigentes hoje OU futuras (índice GiST de vigencia), mais as
+    antigas com período invertido (vigência vazia) e data final ainda não
+    passada, para que um admin as corrija.
+    """
+    query = text("""
+        SELECT id, codigo, produto, oferta, data_inicio, data_final
+        FROM ofertas
+        WHERE vigencia && daterange(CAST(:today AS DATE), NULL)
+           OR (data_final < data_inicio AND data_final >= CAST(:today AS DATE))
+        ORDER BY data_inicio ASC, id ASC
+    """)
+    with engine.connect() as conn:
+        return pd.read_sql(query, conn, params={"today": hoje})
+
+
+def get_ofertas_ativas(engine) -> pd.DataFrame:
+    """Todas as ofertas ativas ou futuras, ordenadas por data de início."""
+    try:
+        hoje = date.today()
+        return obter(NAMESPACE, hoje.isoformat(), lambda: _consultar_ofertas(engine, hoje), TTL_OFERTAS_S)
+    except Exception:
+        # Em caso de erro (ex: tabela não existe ainda), retorna vazio sem quebrar
+        return pd.DataFrame(columns=COLUNAS_OFERTAS)
@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+import pandas as pd
+from sqlalchemy import text
+
+from services.shared_cache import invalidar, obter
+
+# =========================================================
+# PEDIDOS RECENTES POR USUÁRIO (CACHE COMPARTILHADO)
+# =========================================================
+# A lista 'Histórico Recente' da digitação de pedidos é lida a cada rerun.
+# O resultado fica no cache compartilhado entre réplicas e é invalidado
+# quando pedidos são gravados, aprovados ou rejeitados.
+
+NAMESPACE = "pedidos_recentes"
+TTL_PEDIDOS_RECENTES_S = 600
+
+
+def invalidar_pedidos_recentes():
+    """Chamar após o COMMIT de escritas em 'pedidos_consolidados'."""
+    invalidar(NAMESPACE)
+
+
+def _consultar_pedidos_recentes(engine, username, dt_lim):
+    q = text("""
+        SELECT codigo AS "Cód", produto AS "Produto",
+               embseparacao AS "Emb", total_cx AS "Total",
+               status_aprovacao AS "Status",
+               data_pedido AS "Data"
+        FROM pedidos_consolidados
+        WHERE usuario_pedido = :username
+          AND data_pedido >= :dt_lim
+        ORDER BY data_pedido DESC
+    """)
+    df = pd.read_sql_query(q, con=engine, params={
+                           "username": username, "dt_lim": dt_lim})
+    df["Emb"] = pd.to_numeric(
+        df["Emb"], errors='coerce').fillna(0).astype(int)
+    return df
+
+
+def get_pedidos_recentes(engine, username: str) -> pd.DataFrame:
+    """Pedidos do usuário nos últimos 3 dias (mais recentes primeiro)."""
+    dt_lim = (datetime.now() - timedelta(days=3)
+              ).strftime('%Y-%m-%d 00:00:00')
+    return obter(NAMESPACE, f"{username}:{dt_lim}",
+                 lambda: _consultar_pedidos_recentes(engine, username, dt_lim),
+                 TTL_PEDIDOS_RECENTES_S)
@@ -0,0 +1,203 @@
+import io
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from services.cache_metrics import registrar_hit, registrar_miss
+
+# =========================================================
+# CACHE COMPARTILHADO ENTRE RÉPLICAS (SQLITE LOCAL OU REDIS)
+# =========================================================
+# Resultados de consultas ao banco (ofertas, contagem de chamados, pedidos
+# recentes) ficam num armazenamento fora do processo, visível a todas as
+# réplicas da mesma máquina (SQLite no disco de dados) ou de várias máquinas
+# (Redis). Cada namespace tem um contador de versão que faz parte da chave:
+# invalidar = incrementar o contador, e todas as réplicas passam a procurar a
+# chave nova. As entradas antigas somem pelo TTL.
+#
+# SHARED_CACHE_URL   redis://host:6379/0 para usar Redis (precisa do pacote 'redis')
+# SHARED_CACHE_PATH  arquivo SQLite (padrão: <RENDER_DISK_PATH>/shared_cache.sqlite3)
+#
+# Os valores são gravados como dados, nunca como objetos Python (pickle):
+# DataFrames em Parquet e o resto em JSON. Mesmo assim, quem escreve no
+# armazenamento decide o que as páginas mostram: o Redis deve ser privado
+# (rede interna, com senha/TLS) e usado só por este app.
+
+TTL_PADRAO_S = 3600
+
+
+class CacheSQLite:
+    """Backend padrão: um arquivo SQLite (WAL) compartilhado pelos processos da máquina."""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._local = threading.local()
+        self._escritas = 0
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    chave TEXT PRIMARY KEY, valor BLOB NOT NULL, expira REAL NOT NULL)
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS versoes (
+                    namespace TEXT PRIMARY KEY, versao INTEGER NOT NULL)
+            """)
+
+    def _conn(self):
+        # sqlite3 não compartilha conexões entre threads: uma por thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, chave):
+        row = self._conn().execute(
+            "SELECT valor FROM cache WHERE chave = ? AND expira > ?", (chave, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, chave, valor, ttl_s):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)",
+            (chave, valor, time.time() + ttl_s),
+        )
+        # Limpeza ocasional das entradas vencidas (versões antigas)
+        self._escritas += 1
+        if self._escritas % 100 == 0:
+            conn.execute("DELETE FROM cache WHERE expira <= ?", (time.time(),))
+
+    def get_versao(self, namespace):
+        row = self._conn().execute(
+            "SELECT versao FROM versoes WHERE namespace = ?", (namespace,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def incrementar_versao(self, namespace):
+        return self._conn().execute("""
+            INSERT INTO versoes (namespace, versao) VALUES (?, 1)
+            ON CONFLICT (namespace) DO UPDATE SET versao = versao + 1
+            RETURNING versao
+        """, (namespace,)).fetchone()[0]
+
+
+class CacheRedis:
+    """Backend opcional para réplicas em máquinas diferentes."""
+
+    def __init__(self, url):
+        import redis  # dependência opcional
+        self._cliente = redis.Redis.from_url(url)
+        self._cliente.ping()
+
+    def get(self, chave):
+        return self._cliente.get(chave)
+
+    def set(self, chave, valor, ttl_s):
+        self._cliente.set(chave, valor, ex=max(int(ttl_s), 1))
+
+    def get_versao(self, namespace):
+        valor = self._cliente.get(f"versao:{namespace}")
+        return int(valor) if valor is not None else 0
+
+    def incrementar_versao(self, namespace):
+        return int(self._cliente.incr(f"versao:{namespace}"))
+
+
+# Prefixo de 1 byte indicando o formato do valor gravado
+FORMATO_PARQUET = b"P"
+FORMATO_JSON = b"J"
+
+
+def serializar(valor) -> bytes:
+    """DataFrame -> Parquet; demais valores -> JSON (TypeError se não forem serializáveis)."""
+    if hasattr(valor, "to_parquet"):
+        buffer = io.BytesIO()
+        valor.to_parquet(buffer)
+        return FORMATO_PARQUET + buffer.getvalue()
+    return FORMATO_JSON + json.dumps(valor).encode("utf-8")
+
+
+def desserializar(dados: bytes):
+    formato, corpo = dados[:1], dados[1:]
+    if formato == FORMATO_PARQUET:
+        import pandas as pd  # só quando há DataFrame: fora do caminho do login
+        return pd.read_parquet(io.BytesIO(corpo))
+    if formato == FORMATO_JSON:
+        return json.loads(corpo)
+    raise ValueError(f"Formato desconhecido no cache compartilhado: {formato!r}")
+
+
+_lock = threading.Lock()
+_backend = {"instancia": None}
+
+
+def _criar_backend():
+    url = os.getenv("SHARED_CACHE_URL", "")
+    if url.startswith(("redis://", "rediss://")):
+        try:
+            return CacheRedis(url)
+        except Exception as e:
+            print(f"Cache compartilhado: Redis indisponível ({e}), usando SQLite local.")
+
+    caminho = os.getenv("SHARED_CACHE_PATH") or os.path.join(
+        os.environ.get("RENDER_DISK_PATH", "data"), "shared_cache.sqlite3")
+    os.makedirs(os.path.dirname(caminho) or ".", exist_ok=True)
+    return CacheSQLite(caminho)
+
+
+def get_backend():
+    if _backend["instancia"] is None:
+        with _lock:
+            if _backend["instancia"] is None:
+                _backend["instancia"] = _criar_backend()
+    return _backend["instancia"]
+
+
+def get_versao(namespace) -> int:
+    return get_backend().get_versao(namespace)
+
+
+def invalidar(namespace):
+    """Incrementa a versão do namespace (vale para todas as réplicas). Chamar após o COMMIT."""
+    try:
+        get_backend().incrementar_versao(namespace)
+    except Exception as e:
+        print(f"Erro ao invalidar o cache compartilhado '{namespace}': {e}")
+
+
+def obter(namespace, chave, construir, ttl_s=TTL_PADRAO_S):
+    """
+    Valor de 'chave' na versão atual do namespace; se não existir, chama
+    construir(), guarda e devolve. Falhas do armazenamento não impedem a
+    leitura: nesse caso o valor é construído direto.
+    """
+    try:
+        backend = get_backend()
+        chave_completa = f"{namespace}:v{backend.get_versao(namespace)}:{chave}"
+        dados = backend.get(chave_completa)
+    except Exception as e:
+        print(f"Cache compartilhado indisponível: {e}")
+        return construir()
+
+    if dados is not None:
+        try:
+            valor = desserializar(dados)
+            registrar_hit(namespace)
+            return valor
+        except Exception as e:
+            print(f"Entrada inválida no cache compartilhado ({chave_completa}): {e}")
+
+    inicio = time.perf_counter()
+    valor = construir()
+    try:
+        dados = serializar(valor)
+        registrar_miss(namespace, time.perf_counter() - inicio, len(dados))
+        backend.set(chave_completa, dados, ttl_s)
+    except Exception as e:
+        print(f"Erro ao gravar no cache compartilhado: {e}")
+    return valor
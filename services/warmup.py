@@ -0,0 +1,105 @@
+import importlib
+import threading
+import time
+from datetime import datetime
+
+# =========================================================
+# AQUECIMENTO DOS CACHES EM SEGUNDO PLANO
+# =========================================================
+# Na partida do processo (e logo após cada upload de arquivo ou escrita de
+# ofertas) os datasets, os índices derivados e as ofertas (a oferta aplicável
+# por código, que a faixa de oferta da 'Digitação de Pedidos' consulta, e a
+# lista de 'Ofertas Atuais') são carregados numa thread de fundo, para que o
+# primeiro usuário já encontre tudo pronto. Cada tarefa roda uma de cada vez: um pedido que chega durante a
+# execução só marca a tarefa para rodar de novo ao final.
+
+_lock = threading.Lock()
+_tarefas = {}  # nome -> {"rodando", "pendente", "execucoes", "ultima_duracao_s", ...}
+_partida = {"feita": False}
+
+
+def _rodar(nome, tarefa):
+    while True:
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            tarefa()
+        except Exception as e:
+            erro = str(e)
+            print(f"Erro no aquecimento '{nome}': {e}")
+        duracao = time.perf_counter() - inicio
+
+        with _lock:
+            estado = _tarefas[nome]
+            estado["execucoes"] += 1
+            estado["ultima_duracao_s"] = duracao
+            estado["concluido_em"] = datetime.now()
+            estado["erro"] = erro
+            if not estado["pendente"]:
+                estado["rodando"] = False
+                return
+            estado["pendente"] = False
+
+
+def agendar_aquecimento(nome, tarefa):
+    """Roda 'tarefa' em segundo plano; se já estiver rodando, repete uma vez ao final."""
+    with _lock:
+        estado = _tarefas.setdefault(nome, {
+            "rodando": False, "pendente": False, "execucoes": 0,
+            "ultima_duracao_s": None, "concluido_em": None, "erro": None,
+        })
+        if estado["rodando"]:
+            estado["pendente"] = True
+            return
+        estado["rodando"] = True
+
+    threading.Thread(target=_rodar, args=(nome, tarefa),
+                     name=f"aquecimento-{nome}", daemon=True).start()
+
+
+def aquecer_datasets(base_data_path):
+    """Agenda o carregamento do Mix, Histórico e WMS (e dos índices derivados)."""
+    def tarefa():
+        # Import dentro da thread: o pandas e as páginas ficam fora do caminho do login
+        importlib.import_module("page.pedidos").aquecer_datasets(base_data_path)
+    agendar_aquecimento("datasets", tarefa)
+
+
+def aquecer_ofertas(engine):
+    """
+    Agenda a leitura das ofertas (na partida e após cada escrita em 'ofertas'):
+    a oferta aplicável por código (faixa da Digitação de Pedidos) e a lista
+    completa (Ofertas Atuais).
+    """
+    def tarefa():
+        ofertas = importlib.import_module("services.ofertas")
+        ofertas.get_ofertas_aplicaveis(engine)
+        ofertas.get_ofertas_ativas(engine)
+    agendar_aquecimento("ofertas", tarefa)
+
+
+def aquecer_na_partida(engine, base_data_path):
+    """Primeiro aquecimento do processo (as chamadas seguintes não fazem nada)."""
+    if _partida["feita"]:
+        return
+    with _lock:
+        if _partida["feita"]:
+            return
+        _partida["feita"] = True
+    aquecer_datasets(base_data_path)
+    aquecer_ofertas(engine)
+
+
+def get_status_aquecimento() -> list:
+    with _lock:
+        return [
+            {
+                "tarefa": nome,
+                "rodando": estado["rodando"],
+                "execucoes": estado["execucoes"],
+                "ultima_duracao_s": round(estado["ultima_duracao_s"], 2) if estado["ultima_duracao_s"] is not None else None,
+                "concluido_em": estado["concluido_em"].strftime('%d/%m/%Y %H:%M:%S') if estado["concluido_em"] else None,
+                "erro": estado["erro"],
+            }
+            for nome, estado in sorted(_tarefas.items())
+        ]